@@ -316,27 +316,29 @@ class BuildSimulator():
         plt.show()
 
 
-    def find_mil_extremum(self, day_end, mil_built_shift=25):
+    def find_mil_extremum(self, day_end, mil_built_shift=25, search='linear'):
+        # search = 'linear' - перебор civ_built = 1, 2, 3, ...; 'golden' - поиск золотым сечением
     
+        if search == 'linear':
+            mil_built_dict, sim_num = self.find_mil_extremum_linear(day_end, mil_built_shift)
+        elif search == 'golden':
+            mil_built_dict, sim_num = self.find_mil_extremum_golden(day_end, mil_built_shift)
+        else:
+            raise ValueError('Unknown search mode: %s' %search)
+
         mil_built_max, civ_built_optimum, day_1st_mil = 0, 0, 0
         x_coord, y_coord = [], []
         
-        for civ_built in itertools.count(1): 
-
-            build_order = ['civ' for __ in range(civ_built)]
-            x_coord_temp, y_coord_temp = self.build_sim(build_order, day_end)
+        for civ_built, (mil_built, day_1st_mil_temp) in sorted(mil_built_dict.items()): 
 
-            if len(y_coord_temp) < mil_built_shift: # не делаем лишнюю работу, когда результат и так уже понятен
-                break
-
-            mil_built = y_coord_temp[-1]
             x_coord.append(civ_built)
             y_coord.append(mil_built)
 
             if mil_built > mil_built_max:
-                mil_built_max, civ_built_optimum, day_1st_mil = mil_built, civ_built, x_coord_temp[0]
+                mil_built_max, civ_built_optimum, day_1st_mil = mil_built, civ_built, day_1st_mil_temp
 
         print('Optimum: %i factories_build in %i days => %i day_military_f_1st => %i military_f_build' %(civ_built_optimum, day_end, day_1st_mil, mil_built_max))
+        print('Simulations: %i (search: %s)' %(sim_num, search))
         end_date = (GAME_START + timedelta(days=day_end)).date()
         plt.plot(x_coord, y_coord, '.', label = 'Optimum to the day: %s\n%i factories => %i military' %(end_date, civ_built_optimum, mil_built_max))
         plt.title('Finding max num of builded military')
@@ -346,6 +348,70 @@ class BuildSimulator():
         plt.show()
         # plt.savefig('graph.png')
 
+    def get_mil_built(self, civ_built, day_end):
+        # количество воензаводов к day_end и день 1го воензавода (0 - если не построено ни одного)
+
+        build_order = ['civ' for __ in range(civ_built)]
+        x_coord_temp, y_coord_temp = self.build_sim(build_order, day_end)
+
+        if not y_coord_temp:
+            return 0, 0
+        return y_coord_temp[-1], x_coord_temp[0]
+
+    def find_mil_extremum_linear(self, day_end, mil_built_shift):
+
+        mil_built_dict = {}
+
+        for civ_built in itertools.count(1): 
+
+            mil_built, day_1st_mil = self.get_mil_built(civ_built, day_end)
+
+            if mil_built < mil_built_shift: # не делаем лишнюю работу, когда результат и так уже понятен
+                break
+
+            mil_built_dict[civ_built] = (mil_built, day_1st_mil)
+
+        return mil_built_dict, civ_built
+
+    def find_mil_extremum_golden(self, day_end, mil_built_shift, scan_width=5):
+        # граница поиска: civ_built = 1, 2, 4, ... пока воензаводов не меньше mil_built_shift, 
+        # затем золотое сечение; при равенстве значений (плато) или коротком отрезке - перебор оставшегося отрезка
+
+        mil_built_dict = {}
+
+        def get_mil_built_temp(civ_built): 
+            if civ_built not in mil_built_dict:
+                mil_built_dict[civ_built] = self.get_mil_built(civ_built, day_end)
+
+            mil_built = mil_built_dict[civ_built][0]
+            return mil_built if mil_built >= mil_built_shift else -1
+
+        civ_built_max = 1
+        while get_mil_built_temp(civ_built_max) >= 0:
+            civ_built_max *= 2
+
+        a, b = 1, civ_built_max - 1
+        inv_phi = (math.sqrt(5) - 1) / 2
+
+        while b - a > scan_width:
+
+            c = b - round((b - a) * inv_phi)
+            d = a + round((b - a) * inv_phi)
+            mil_built_c, mil_built_d = get_mil_built_temp(c), get_mil_built_temp(d)
+
+            if mil_built_c < mil_built_d:
+                a = c + 1
+            elif mil_built_c > mil_built_d:
+                b = d - 1
+            else:
+                break
+
+        for civ_built in range(a, b + 1):
+            get_mil_built_temp(civ_built)
+
+        mil_built_dict_shift = {civ_built:value for civ_built, value in mil_built_dict.items() if value[0] >= mil_built_shift}
+        return mil_built_dict_shift, len(mil_built_dict)
+
 # =====================================================
 # CLIENT
 # =====================================================
@@ -21,6 +21,7 @@
 #     - show_plot() - 2 графика в зависимости от изначального уровня инфраструктуры в ячейках:
 #         - "точки равновесия" по описанной выше схеме
 #         - фабрики, построенных в ячейке 0 в момент "точки равновесия" 
+#     - equilibrium_table() - те же точки равновесия для всех уровней изначальной инфраструктуры за 1 проход (без печати, с запоминанием)
 # -----------------------------------------------------
 # источники при составлении:
 
@@ -31,6 +32,7 @@
 import matplotlib.pyplot as plt
 import math
 import itertools
+import functools
 from datetime import datetime, timedelta
 
 # =====================================================
@@ -234,8 +236,11 @@ def get_fact_available(): # замечание: однозначно опред
     # fact_available изменяется при постройке фабрики, а также при изменений закона, если закон - среди ключей CONS_GOODS_MODIFICATORS
     # функция используется как вспомогательная функция для change_fact_diff()
 
-    fact_built_list = obj_built['fact']
-    cons_goods_penalty = get_cons_goods_penalty()
+    return get_fact_available_by_penalty(obj_built['fact'], get_cons_goods_penalty())
+
+def get_fact_available_by_penalty(fact_built_list, cons_goods_penalty):
+    # то же, что get_fact_available(), но по явным параметрам (без глобальных переменных)
+
     cons_goods_required = [math.ceil(item * cons_goods_penalty) for item in fact_built_list]
     fact_available = [built - required for built, required in zip(fact_built_list, cons_goods_required)]
         
@@ -248,8 +253,13 @@ def get_build_bonus(): # замечание: однозначно определ
     # build_bonus изменяется при переключении с инфраструктуры на фабрики в ячейке 0, а также при изменении закона
     # функция используется как вспомогательная функция для get_progress_per_day()
 
+    return get_build_bonus_by_laws(laws_current)
+
+def get_build_bonus_by_laws(laws):
+    # то же, что get_build_bonus(), но по явному набору законов laws (без глобальных переменных)
+
     build_bonus = {'infr':1, 'fact':1}
-    for key, value in laws_current.items():
+    for key, value in laws.items():
         build_bonus['infr'] += BUILD_MODIFICATORS[value][0]
         build_bonus['fact'] += BUILD_MODIFICATORS[value][1]
 
@@ -270,7 +280,11 @@ def get_progress_per_day(infr_initial, infr_plus_num):
     # progress_per_day - актуальное изменение прогресса строительтва в ячейках за день
     # progress_per_day изменяется при переключении строительства с инфраструктуры на фабрики в ячейке 0, а также при изменении закона
 
-    build_bonus = get_build_bonus()
+    return get_progress_per_day_by_bonus(get_build_bonus(), infr_initial, infr_plus_num, is_infr_completed(infr_plus_num))
+
+def get_progress_per_day_by_bonus(build_bonus, infr_initial, infr_plus_num, infr_completed):
+    # то же, что get_progress_per_day(), но по явным параметрам (без глобальных переменных)
+
     infr_speed_bonus = build_bonus['infr'] 
     fact_speed_bonus = build_bonus['fact']
 
@@ -278,7 +292,7 @@ def get_progress_per_day(infr_initial, infr_plus_num):
     infr_bonus = [(10 + infr_max_cell) / 10 for infr_max_cell in infr_max] # бонус от инфраструктуры ячеек при строительстве фабрик
 
     progress_per_day = [15 * 5 * fact_speed_bonus * infr_bonus_cell for infr_bonus_cell in infr_bonus]
-    if not is_infr_completed(infr_plus_num):
+    if not infr_completed:
         progress_per_day[0] = 15 * 5 * infr_speed_bonus
 
     return progress_per_day
@@ -466,6 +480,108 @@ def equilibrium(infr_initial, infr_plus_num=1):
 
     return (day, obj_built['fact'][0]) # замечание: нужно только для графика
 
+# =====================================================
+# ПАКЕТНАЯ СИМУЛЯЦИЯ - ДЛЯ ГРАФИКА:
+# =====================================================
+
+# замечание: 
+# equilibrium() работает через глобальные переменные и сбрасывает их на старте => одна симуляция за вызов;
+# для графика же нужны равновесия по всем уровням изначальной инфраструктуры при одних и тех же законах
+# => equilibrium_levels() - "чистая" версия той же симуляции: все уровни за один проход по дням 
+# (законы меняются в одни и те же дни - их обработка общая), без глобальных переменных и печати;
+# результат запоминается по (infr_plus_num, laws_timeline)
+
+def get_laws_timeline_key(laws_timeline):
+    # неизменяемая копия laws_timeline - ключ для запоминания результатов equilibrium_levels()
+    return tuple((date_to_change_law, tuple(laws_to_change)) for date_to_change_law, laws_to_change in laws_timeline)
+
+@functools.lru_cache(maxsize=None)
+def equilibrium_levels(infr_plus_num, laws_timeline_key):
+    # симуляция equilibrium() сразу для всех уровней изначальной инфраструктуры: 0 <= infr_initial <= 10 - infr_plus_num
+    # laws_timeline_key - см get_laws_timeline_key()
+    # возвращает кортеж пар (day, fact_built_cell_0) - как equilibrium(); индекс = infr_initial
+
+    infr_init_levels = range(0, 11 - infr_plus_num)
+
+    laws = {} # актуальный набор законов - общий для всех уровней
+    laws_queue = list(laws_timeline_key)
+    build_bonus = get_build_bonus_by_laws(laws)
+    leap_year_count = 0
+
+    # состояние симуляции по уровням (индекс = infr_initial):
+    progress = [[0, 0] for infr_initial in infr_init_levels]
+    infr_built = [0 for infr_initial in infr_init_levels]
+    fact_built = [[0, 0] for infr_initial in infr_init_levels]
+    fact_diff_total = [0 for infr_initial in infr_init_levels]
+    fact_diff_actual = [0 for infr_initial in infr_init_levels]
+    progress_per_day = [get_progress_per_day_by_bonus(build_bonus, infr_initial, infr_plus_num, infr_plus_num == 0) for infr_initial in infr_init_levels]
+    result = [None for infr_initial in infr_init_levels]
+
+    def change_fact_diff(infr_initial):
+        fact_available = get_fact_available_by_penalty(fact_built[infr_initial], CONS_GOODS_MODIFICATORS[laws['law3']])
+        fact_diff_actual[infr_initial] = fact_available[1] - fact_available[0]
+
+    for day in itertools.count(1): # порядок действий за день - как в equilibrium()
+
+        if day in leap_days_from_start: 
+            leap_year_count += 1
+
+        running_levels = [infr_initial for infr_initial in infr_init_levels if result[infr_initial] is None]
+
+        # чек постройки объектов - ячейки 0 и 1:
+        for infr_initial in running_levels:
+            progress_level = progress[infr_initial]
+
+            if infr_built[infr_initial] != infr_plus_num:
+                if progress_level[0] >= COST_DICT['infr']:
+                    infr_built[infr_initial] += 1
+                    progress_level[0] = progress_level[0] - COST_DICT['infr']
+
+                    if infr_built[infr_initial] == infr_plus_num: # достроили инфраструктуру в ячейке 0
+                        progress_per_day[infr_initial] = get_progress_per_day_by_bonus(build_bonus, infr_initial, infr_plus_num, True)
+                        progress_level[0] = 0
+            
+            elif progress_level[0] >= COST_DICT['fact']:
+                fact_built[infr_initial][0] += 1
+                progress_level[0] = progress_level[0] - COST_DICT['fact']
+                change_fact_diff(infr_initial)
+
+            if progress_level[1] >= COST_DICT['fact']:
+                fact_built[infr_initial][1] += 1
+                progress_level[1] = progress_level[1] - COST_DICT['fact']
+                change_fact_diff(infr_initial)
+
+        # чек изменения закона - один на все уровни:
+        if laws_queue and day == (laws_queue[0][0] - GAME_START).days - leap_year_count:
+
+            is_cons_goods_law = False
+            for law in laws_queue.pop(0)[1]:
+                laws[BUILD_MODIFICATORS[law][-1]] = law
+                if law in CONS_GOODS_MODIFICATORS:
+                    is_cons_goods_law = True
+
+            build_bonus = get_build_bonus_by_laws(laws)
+            for infr_initial in running_levels:
+                if is_cons_goods_law:
+                    change_fact_diff(infr_initial)
+                progress_per_day[infr_initial] = get_progress_per_day_by_bonus(build_bonus, infr_initial, infr_plus_num, infr_built[infr_initial] == infr_plus_num)
+
+        # изменение прогресса ячеек и выход из цикла:
+        for infr_initial in running_levels:
+            for cell_num, day_progress in enumerate(progress_per_day[infr_initial]):
+                progress[infr_initial][cell_num] += day_progress
+
+            fact_diff_total[infr_initial] += fact_diff_actual[infr_initial]
+            if fact_diff_total[infr_initial] < 0 or day == 3000: # замечание: day == 3000 - защита от бесконечного цикла, как в equilibrium()
+                result[infr_initial] = (day, fact_built[infr_initial][0])
+
+        if all(result):
+            return tuple(result)
+
+def equilibrium_table(infr_plus_num=1):
+    # равновесия для всех уровней изначальной инфраструктуры при текущем laws_timeline (см equilibrium_levels())
+    return equilibrium_levels(infr_plus_num, get_laws_timeline_key(laws_timeline))
+
 def show_plot(infr_plus_num=1):
     # 2 графика окупаемости строительства инфраструктуры согласно описанию в шапке файла
     # infr_plus_num - количество уровней инфраструктуры, которые будут построены в ячейке 0
@@ -484,9 +600,11 @@ def show_plot(infr_plus_num=1):
     fig.set_size_inches(10, 5) # замечание: опционально под параметры монитора
     fig.canvas.set_window_title('HOI4 Infrastructure Efficiency')
 
+    infr_init_levels = list(range(0, 11 - infr_plus_num)) # замечание: берем такой range, тк infr_initial + infr_plus_num <= 10
+    equilibrium_list = equilibrium_table(infr_plus_num) # оба графика - по одному проходу симуляции
+
     for idx, row in enumerate(ax):
-        infr_init_levels = list(range(0, 11 - infr_plus_num)) # замечание: берем такой range, тк infr_initial + infr_plus_num <= 10
-        x_coord, y_coord = [infr_init_levels, [equilibrium(infr_level, infr_plus_num)[idx] for infr_level in infr_init_levels]]
+        x_coord, y_coord = [infr_init_levels, [equilibrium_list[infr_level][idx] for infr_level in infr_init_levels]]
         row.plot(x_coord, y_coord, color_list[idx])
         row.set_xlabel(x_label)
         row.set_ylabel(y_label_list[idx])
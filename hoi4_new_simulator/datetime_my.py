@@ -10,60 +10,57 @@
 # и поэтому стандартный datetime не работает (либо нужны лишние танцы с бубном для его допиливания под конкретную ситуацию)
 # -----------------------------------------------------
 
-from itertools import chain
+import numpy as np
 
 month_days_dict = {1:31, 2:28, 3:31, 4:30, 5:31, 6:30, 7:31, 8:31, 9:30, 10:31, 11:30, 12:31}
+
+# -----------------------------------------------------
+# таблицы календаря (без высокосных лет => одни на все годы):
+# -----------------------------------------------------
+
+# days_before_month[month] - количество дней в году до 1го числа месяца month 
+# (month = 13 - весь год; month = 0 - как и для month < 1: дней до месяца нет)
+days_before_month = tuple(sum(month_days_dict[month_temp] for month_temp in range(1, month)) for month in range(0, 14))
+
+# month_of_day[day_idx] - месяц для дня года day_idx (от 0 до 364)
+month_of_day = tuple(month for month in range(1, 13) for __ in range(month_days_dict[month]))
+
+# то же - для пакетного перевода дней в даты (см add_days_batch())
+days_before_month_array = np.array(days_before_month)
+month_of_day_array = np.array(month_of_day)
 # -----------------------------------------------------
 
 def get_days_total(date):
     year, month, day = date
-    days = 365 * year
-    for month in range(1, month):
-        days += month_days_dict[month]
-    days+= day
-    return days
+    if month < 1: 
+        month = 0
+    return 365 * year + days_before_month[month] + day
 
 def get_days_diff(date_1, date_2):
     days_1 = get_days_total(date_1)
     days_2 = get_days_total(date_2)
     return days_2 - days_1
 
+def get_date(days_total):
+    # обратная к get_days_total() функция: дата по количеству дней 
+    # (день с номером days_total, кратным 365 - это 31 декабря предыдущего года)
+    
+    year, day_idx = divmod(days_total - 1, 365)
+    month = month_of_day[day_idx]
+    return year, month, day_idx + 1 - days_before_month[month]
+
 def add_days(date, days):
-  
-    # print(date, days)
-    year, month, day = date
+    return get_date(get_days_total(date) + days)
 
-    # устанавливаем - какой будет год
-    while days > 365:
-        days -= 365
-        year += 1
-    # print(year, month, day, days)
+def add_days_batch(date, days_array):
+    # пакетная версия add_days(): даты для каждого количества дней из days_array (например, для дней из лога симуляции)
+    # возвращает кортеж из 3х массивов numpy: (годы, месяцы, дни)
     
-    if get_days_total((0, month, day)) + days > 365:
-        year += 1
-    # print(year, month, day, days)
+    days_total = get_days_total(date) + np.asarray(days_array, dtype=np.int64)
     
-    # остальная часть - дорабатываем месяцы, дни
-    month_list = list(chain(range(month, 13), range(1, 13)))  
-    # print(month_list)
-
-    for idx, month_temp in enumerate(month_list):
-
-        if days + day > month_days_dict[month_temp]: # => как минимум следующий месяц
-            days -= month_days_dict[month_temp]
-            # print(month_temp, year, month, day, days, days+day)
-        
-        else: # => определили месяц, 
-              # при этом days может быть отрицательным, но если условия выше хоть раз страбатывали, из них следует: 
-              # day > month_days - days => day > - days (обновленного) 
-              # => если days - отрицательное, то day > abs(days), и мы никогда не получим в day += days отрицательное значение;
-              # если же условие выше не срабатывало, то все элементарно, при этом - выводы те же
-            day += days
-            month = month_temp
-            # print(month_temp, year, month, day, days, days+day)
-            break
-
-    return year, month, day 
+    year, day_idx = np.divmod(days_total - 1, 365)
+    month = month_of_day_array[day_idx]
+    return year, month, day_idx + 1 - days_before_month_array[month]
  
 # =====================================================
 def testing():
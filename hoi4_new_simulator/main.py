@@ -12,7 +12,7 @@
     # - http://www.hoi4wiki.com
 # =====================================================
 
-from simulator import Cell, BuildSimulator, BuildSimMaxMilitary, BuildSimInfrEfficiency
+from simulator import Cell, BuildSimulator, BuildSimMaxMilitary, BuildSimInfrEfficiency, ResultCache, ResultStore, LawSchedule, BuildOrderRuns, BuildLog
 
 # =====================================================
 # ИНФОРМАЦИЯ ДЛЯ ПОЛЬЗОВАТЕЛЯ:
@@ -21,6 +21,30 @@ from simulator import Cell, BuildSimulator, BuildSimMaxMilitary, BuildSimInfrEff
 # BuildSimulator.printout = True # подробная печать событий в приложениях build_sim
 # BuildSimulator.printout = False # краткая печать событий (установлена по умолчанию)
 
+# BuildSimulator.event_driven = True # движок симуляции по событиям - тот же результат, но без прохода по "пустым" дням
+# BuildSimulator.event_driven = False # движок симуляции по дням (установлен по умолчанию)
+# BuildSimulator.fixed_point = True # прогресс строительства - целые тысячные очка (точно и одинаково на любой платформе); по умолчанию - float
+
+# sim.quiet = True # тихий режим для отдельной симуляции sim - ничего не печатает (работает и в нескольких потоках)
+# BuildSimulator.pool_threads = True # параллельные симуляции (workers=...) - в пуле потоков вместо пула процессов
+
+# BuildSimulator.result_cache = ResultCache(maxsize=256) # кэш результатов build_sim: повторные сценарии не симулируются
+# print(BuildSimulator.result_cache) # счетчики кэша: найдено/не найдено
+# BuildSimulator.result_store = ResultStore('results.db') # хранилище результатов на диске: сценарии из прошлых запусков не симулируются
+
+# laws_timeline = LawSchedule(country, laws_timeline) # расписание законов можно скомпилировать заранее и передавать во все симуляции страны
+
+# build_order = BuildOrderRuns([(None, 'civ', 30), (None, 'mil', None)]) # очередь по отрезкам (None - бесконечный отрезок); можно и генератор
+# BuildSimulator.log_columnar = True # build_sim возвращает BuildLog: build_log.get_count('mil', day), get_first_day('mil'), get_obj_days('civ', day)
+# for event in sim.build_sim_iter(...): ... # потоковый режим: события LawEvent/BuildEvent/EndEvent по мере симуляции (можно остановиться досрочно)
+# state = sim.save_state() # снимок состояния (дешевый: ячейки общие до первого изменения) => sim.load_state(state); sim.run_sim() - продолжение с того же дня
+# sim.save_state_file('state.bin'); sim.load_state_file('state.bin') # снимок состояния в компактном двоичном файле (с версией формата и констант) => sim.run_sim()
+# ussr_sim.find_mil_extremum(..., checkpoint_path='sweep.bin') # прогресс перебора в файле: прерванный перебор продолжается с места остановки (также visualize_equilibrium)
+# sim.law_checkpoints = True # повторный build_sim() с измененным laws_timeline - с последнего дня, до которого законы не изменились (тот же build_log)
+# sim.build_sim_batch(sim_args_list) # пакетная симуляция (numpy) - все сценарии сразу; используется в visualize_efficiency без workers
+# BuildSimInfrEfficiency.equilibrium_analytic = False # BuildSimInfrEfficiency: день равновесия - по дням, а не сразу (по умолчанию True - от события к событию)
+# ger_sim.get_payback(infr_initial, infr_up, laws_timeline) # окупаемость из таблицы (infr_initial, infr_up) - общей для is_cell_profitable/is_any_cell_profitable/visualize_equilibrium
+
 # =====================================================
 
 country_list = ['СССР', 'ГЕРМАНИЯ', 'ЯПОНИЯ', 'ИТАЛИЯ', 'ФРАНЦИЯ', 'США', 'ВБ']
@@ -138,7 +162,25 @@ def example_6():
     
     ussr_sim.build_sim(build_order, laws_timeline, civ_trade_av)
 
-example_6()
+def example_7():
+    ussr_sim = BuildSimMaxMilitary('СССР')
+
+    infr_av = 6 # средняя инфраструктура
+    civ_trade_av = 10 # среднее количество фабрик от торговли
+    date_end_list = [(year, month, 1) for year in range(1937, 1945) for month in range(1, 13)] + [(1945, 1, 1)] # оптимум на каждый месяц
+    
+    laws_timeline = [ # формат laws_timeline для определенной страны - из country_list - см *замечание
+                      [(1936, 3, 11), ['Свободная_торговля']], 
+                      [(1936, 6, 27), ['Строительство_1']], 
+                      [(1937, 4, 22), ['Строительство_2']], 
+                      [(1937, 12, 1), ['Военная_экономика']],
+                      [(1939, 4, 15), ['Строительство_3']] 
+                    ]
+    
+    ussr_sim.find_mil_extremum(infr_av, laws_timeline, civ_trade_av, date_end_list) # один перебор до самой поздней даты
+
+if __name__ == '__main__': # нужно для параллельных симуляций (см get_executor() в simulator.py)
+    example_6()
 
 
 
@@ -1,7 +1,8 @@
 import matplotlib.pyplot as plt
 import math
 import itertools
-from copy import deepcopy
+import numpy as np
+from copy import copy, deepcopy
 
 from datetime_my import get_days_diff, add_days
 
@@ -10,6 +11,15 @@ from datetime_my import get_days_diff, add_days
 # -----------------------------------------------------
 
 import sys, os
+import io, contextlib, random
+import threading
+from collections import OrderedDict, namedtuple, deque
+import sqlite3, json, hashlib, struct, zlib, marshal
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# замечание: 
+# disable_printout()/enable_printout() меняют sys.stdout всего процесса => не годятся для симуляций в нескольких потоках;
+# для отдельной симуляции есть тихий режим - поле quiet (см BuildSimulator.print_sim())
 
 def disable_printout(): # полностью блокирует печать в консоль
     sys.stdout = open(os.devnull, 'w') 
@@ -29,6 +39,10 @@ def enable_printout(): # разблокирует печать
 # OBJ_COST - стоимость постройки объектов 
 OBJ_COST = {'infr':3000, 'civ':10800, 'mil':7200}
 
+# FIXED_POINT_SCALE - единиц прогресса в 1 очке строительства в режиме с фиксированной точкой (см BuildSimulator.fixed_point)
+# замечание: бонусы строительства - с точностью до сотых => 5 * бонус * (10 + инфраструктура) / 10 * фабрики - целое число тысячных
+FIXED_POINT_SCALE = 1000
+
 # LAWS_MODIFICATORS - модификаторы скорости строительства и штрафа ТНП в зависимости от законов, технологий и советников
 # формат LAWS_MODIFICATORS - law_title:{{модификаторы_строительства}, 'tag':law_tag, 'cons_goods_penalty':штраф_ТНП (опционально)}
 
@@ -152,21 +166,19 @@ class Cell():
     
     # поле INFRASTR_DEFAULT - служебная константа: 
     # значение по умолчанию для инфраструктуры ячейки 
+    # (симуляции его не меняют - у каждой симуляции свое значение, см BuildSimulator.infr_default)
     INFRASTR_DEFAULT = 5
     
     # поле GENERIC_NAME_BASE - служебная константа: 
     # базовое значение для имени generic-ячейки
+    # (дополняется номером generic_number => уникальное имя в рамках симуляции, см BuildSimulator.expand_cells_dict())
     GENERIC_NAME_BASE = 'generic_'
     
-    # поле GENERIC_NUMBER - служебная константа: 
-    # значение-счетчик для дополнения базовой части имени generic-ячейки => обеспечивает уникальное имя
-    GENERIC_NUMBER = 1 
-    
     # -----------------------------------------------------
     # инициализация класса:
     # -----------------------------------------------------
     
-    def __init__(self, name=None, infrastructure=None, obj_available=sys.maxsize, country=COUNTRY_DEFAULT): 
+    def __init__(self, name=None, infrastructure=None, obj_available=sys.maxsize, country=COUNTRY_DEFAULT, generic_number=None): 
         # замечание: можно было использовать obj_available=float('inf'), 
         # но ч/з sys.maxsize мы остаемся последовательными, тк всю дорогу int 
         
@@ -176,9 +188,10 @@ class Cell():
         # подробнее здесь:
         # https://stackoverflow.com/questions/5555449/using-self-xxxx-as-default-parameter-python/5555470#5555470
 
-        if name is None:
-            self.name = Cell.GENERIC_NAME_BASE + str(Cell.GENERIC_NUMBER) # имя ячейки 
-            Cell.GENERIC_NUMBER += 1
+        if name is None and isinstance(generic_number, int):
+            self.name = Cell.GENERIC_NAME_BASE + str(generic_number) # имя ячейки 
+        elif name is None:
+            raise ValueError("%s - некорректное значение для номера generic-ячейки!" %generic_number)
         elif isinstance(name, str) and not name.startswith(Cell.GENERIC_NAME_BASE): 
             # замечание: на всякий случай запрещено использовать name, начинающийся с Cell.GENERIC_NAME_BASE 
             self.name = name 
@@ -201,6 +214,15 @@ class Cell():
             self.country = country # страна ячейки
         else:
             raise ValueError("%s - некорректное значение для страны ячейки!" %country)
+    
+    @classmethod
+    def from_fields(cls, name, infrastructure, obj_available, country):
+        # ячейка по полям ячейки, которая уже прошла проверки __init__() (из файла снимка - см BuildSimulator.decode_state())
+        # замечание: без проверок - ячеек в снимке могут быть сотни, а имя generic-ячейки здесь допустимо
+        
+        cell = cls.__new__(cls)
+        cell.name, cell.infrastructure, cell.obj_available, cell.country = name, infrastructure, obj_available, country
+        return cell
             
     # -----------------------------------------------------
     # печать и get-методы:
@@ -235,9 +257,755 @@ class Cell():
             self.infrastructure += 1
 
     def obj_available_down(self):
-        if self.obj_available > 0:
+        if self.obj_available > 0 and self.obj_available != sys.maxsize: # sys.maxsize - клеток без ограничения (см __init__())
             self.obj_available -= 1
 
+# =====================================================
+# класс ProgressLine - линия строительства (элемент BuildSimulator.progress):
+
+    # аргументы для инициализации: 
+    # - cell_name, obj_type, num_to_build - элемент очереди строительства, взятый на линию (см build_sim())
+    # - build_points - прогресс линии
+    
+    # - infr_bonus - кэш бонуса инфраструктуры ячейки линии (см BuildSimulator.get_progress_per_day()): 
+    #   инфраструктура ячейки меняется только при постройке в ней инфраструктуры => тогда кэш и сбрасывается
+    # - completion - кэш движка по событиям: (изменение прогресса за день, день постройки объекта на линии) 
+    #   день постройки не меняется, пока прогресс линии растет с тем же изменением за день (см BuildSimulator.get_days_to_next_event())
+    #   => кэш сбрасывается только при изменении прогресса не по дням (остаток после постройки объекта)
+    
+    # замечание: 
+    # __slots__ - линий немного, но обращений к ним - каждый день симуляции; 
+    # поля линии - неизменяемые значения => копия линии - ProgressLine с теми же полями (см copy())
+
+class ProgressLine():
+    
+    __slots__ = ('cell_name', 'obj_type', 'num_to_build', 'build_points', 'infr_bonus', 'completion')
+    
+    def __init__(self, cell_name, obj_type, num_to_build, build_points=0, infr_bonus=None, completion=None):
+        self.cell_name = cell_name
+        self.obj_type = obj_type
+        self.num_to_build = num_to_build
+        self.build_points = build_points
+        self.infr_bonus = infr_bonus
+        self.completion = completion
+    
+    def __deepcopy__(self, memo):
+        return self.copy()
+    
+    def copy(self): # для save_state()
+        return ProgressLine(self.cell_name, self.obj_type, self.num_to_build, self.build_points, self.infr_bonus, self.completion)
+    
+    def get_order(self):
+        # элемент очереди строительства - для возврата линии в очередь (см progress_change_lines_num())
+        return [self.cell_name, self.obj_type, self.num_to_build]
+
+# =====================================================
+# прогресс линии за много дней (float):
+
+    # в симуляции по дням прогресс линии растет сложением build_points += progress_per_day - с округлением float на каждом шаге
+    # => build_points + days * progress_per_day может отличаться в последних знаках, а с ним - и день постройки и остаток прогресса 
+    
+    # замечание: 
+    # пока build_points в одном двоичном порядке [2^k, 2^(k+1)), у всех значений один шаг сетки float (ulp) 
+    # => округленная сумма растет на одно и то же приращение step = (build_points + progress_per_day) - build_points 
+    # (кроме случая, когда progress_per_day делит шаг сетки ровно пополам - тогда округление зависит от четности build_points)
+    # => сложение по дням в пределах порядка - точное умножение, а порядков от 0 до стоимости объекта - пара десятков
+    # (на несколько десятков дней прямое сложение быстрее - см PROGRESS_DAYS_DIRECT)
+# =====================================================
+
+PROGRESS_DAYS_DIRECT = 512 # столько дней и меньше - прямое сложение по дням (по замерам - быстрее порядков до ~500-1000 дней)
+
+def get_progress_block(build_points, progress_per_day, days):
+    # сколько дней (не больше days) сложение по дням точно совпадает с build_points + j * step, и step (см замечание выше)
+    # 0 - следующий день нужно сложить как есть (смена порядка, build_points <= 0 или округление зависит от четности)
+    
+    if build_points <= 0:
+        return 0, None
+    
+    ulp = math.ulp(build_points)
+    if 2 * math.fmod(progress_per_day, ulp) == ulp:
+        return 0, None
+    
+    step = (build_points + progress_per_day) - build_points # точно: оба значения - на сетке порядка build_points
+    if step == 0: # progress_per_day меньше половины шага сетки => build_points больше не меняется
+        return days, step
+    
+    order_end = 2 * 2 ** (math.frexp(build_points)[1] - 1) # начало следующего порядка
+    block_days = min(days, max(0, int((order_end - build_points - progress_per_day) / step) + 1))
+    
+    # сумма в последний день блока должна остаться в порядке (float-сравнение < точной суммы не пропустит выход из порядка)
+    while block_days > 0 and not build_points + (block_days - 1) * step + progress_per_day < order_end:
+        block_days -= 1
+    return block_days, step
+
+def add_progress_days(build_points, progress_per_day, days):
+    # build_points после days дней сложения по дням (float) - бит в бит, но за число порядков, а не дней
+    
+    if days <= PROGRESS_DAYS_DIRECT:
+        for __ in range(days):
+            build_points += progress_per_day
+        return build_points
+    
+    while days > 0:
+        
+        block_days, step = get_progress_block(build_points, progress_per_day, days)
+        if block_days == 0:
+            build_points += progress_per_day
+            days -= 1
+        else:
+            build_points += block_days * step # точно: block_days * step и сумма - на сетке порядка build_points
+            days -= block_days
+    
+    return build_points
+
+def get_days_to_complete_float(build_points, object_cost, progress_per_day, days_max):
+    # первый день (от 1 до days_max) сложения по дням, когда build_points >= object_cost (None - не в пределах days_max)
+    
+    # оценка: ceil((object_cost - build_points) / progress_per_day) - точная, если частное не ближе к целому, чем погрешность: 
+    # за k дней сложение по дням отходит от build_points + k * progress_per_day не больше, чем на k * ulp / 2 
+    # (все значения - не больше object_cost + 2 * progress_per_day), деление и вычитание - еще на пару ulp
+    days_est = (object_cost - build_points) / progress_per_day
+    days = math.ceil(days_est)
+    if days_est > 0 and days <= days_max:
+        days_error = (days + 2) * math.ulp(object_cost + 2 * progress_per_day) / progress_per_day + days_est * 2 ** -50
+        if days - days_est > days_error and days_est - (days - 1) > days_error:
+            return days
+    
+    days = 0
+    if object_cost - build_points <= PROGRESS_DAYS_DIRECT * progress_per_day: # объект - не дальше пары десятков дней => прямое сложение
+        while days < days_max:
+            build_points += progress_per_day
+            days += 1
+            if build_points >= object_cost:
+                return days
+    
+    while days < days_max:
+        
+        block_days, step = get_progress_block(build_points, progress_per_day, days_max - days)
+        if block_days == 0:
+            build_points += progress_per_day
+            days += 1
+            if build_points >= object_cost:
+                return days
+            continue
+        
+        if step == 0: # build_points больше не меняется
+            return None
+        if build_points + block_days * step < object_cost: # в этом порядке объект не построен
+            build_points += block_days * step
+            days += block_days
+            continue
+        
+        # оценка ceil((object_cost - build_points) / step) + точная проверка соседних дней (значения блока - точные)
+        block_day = min(max(1, math.ceil((object_cost - build_points) / step)), block_days)
+        while block_day > 1 and build_points + (block_day - 1) * step >= object_cost:
+            block_day -= 1
+        while build_points + block_day * step < object_cost:
+            block_day += 1
+        return days + block_day
+    
+    return None
+
+# =====================================================
+# ленивые источники очереди строительства (build_order в build_sim() - вместо списка):
+
+    # - BuildOrderRuns - очередь, сжатая по отрезкам: (cell_name, obj_type, count) => count элементов [cell_name, obj_type, 1]
+    #   (count = None - бесконечный отрезок, cell_name = None - новая generic-ячейка на каждый элемент)
+    # - BuildOrderSource - любой итерируемый объект с элементами очереди (генератор, itertools.repeat(...) и тд)
+    
+    # элементы источника берутся симуляцией по одному - по мере надобности (см BuildSimulator.pull_build_order()) 
+    # и только тогда проверяются => память и работа на элемент очереди не зависят от ее длины
+    
+    # замечание: 
+    # источник меняется в ходе симуляции => build_sim() работает с копией; 
+    # копия BuildOrderSource - ч/з itertools.tee (генератор нельзя скопировать), поэтому элементы источника копируются при взятии
+# =====================================================
+
+class BuildOrderRuns():
+    
+    def __init__(self, runs):
+        
+        self.runs = [] # отрезки очереди: [cell_name, obj_type, count] (count - сколько элементов отрезка осталось)
+        for cell_name, obj_type, count in runs:
+            if count is not None and (not isinstance(count, int) or count < 0):
+                raise ValueError("%s - некорректное значение для количества элементов очереди строительства!" %count)
+            self.runs.append([cell_name, obj_type, count])
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        
+        while self.runs and self.runs[0][2] == 0: # отрезков - единицы
+            self.runs.pop(0)
+        
+        if not self.runs:
+            raise StopIteration
+        
+        run = self.runs[0]
+        if run[2] is not None:
+            run[2] -= 1
+        return [run[0], run[1], 1]
+    
+    def __len__(self): # оставшиеся элементы (sys.maxsize - бесконечная очередь)
+        if any(count is None for __, __, count in self.runs):
+            return sys.maxsize
+        return sum(count for __, __, count in self.runs)
+    
+    def __str__(self):
+        
+        runs_str = ''
+        for cell_name, obj_type, count in self.runs:
+            if count == 0:
+                continue
+            if cell_name is None:cell_name = Cell.GENERIC_NAME_BASE + '...'
+            if count is None:count = '∞'
+            runs_str += "- ячейка: %s, заказанный_объект: '%s' (количество = 1) x %s\n" %(cell_name, obj_type, count)
+        
+        return runs_str
+    
+    def extend(self, cell_name, obj_type, count=1):
+        # добавление элементов в конец очереди (к последнему отрезку, если он такой же и конечный)
+        
+        if self.runs and self.runs[-1][:2] == [cell_name, obj_type] and self.runs[-1][2] is not None:
+            self.runs[-1][2] += count
+        else:
+            self.runs.append([cell_name, obj_type, count])
+    
+    def get_key(self): # для сценария симуляции (см BuildSimulator.get_scenario())
+        return freeze_value([run for run in self.runs if run[2] != 0])
+    
+    def get_cell_names(self):
+        return {cell_name for cell_name, __, __ in self.runs}
+
+class BuildOrderSource():
+    
+    def __init__(self, order_items):
+        self.order_items = iter(order_items)
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        return next(self.order_items)
+    
+    def __deepcopy__(self, memo): # для build_sim() и save_state(): обе копии дальше идут независимо
+        self.order_items, order_items = itertools.tee(self.order_items)
+        return BuildOrderSource(order_items)
+    
+    def __str__(self):
+        return '- ... (далее - элементы ленивого источника очереди)\n'
+    
+    def get_key(self): # элементы источника заранее неизвестны => сценарий не определен
+        return None
+    
+    def get_cell_names(self):
+        return set()
+
+# =====================================================
+# класс LawSchedule - расписание законов, скомпилированное из стартовых законов страны и laws_timeline:
+
+    # аргументы для инициализации: 
+    # - country - страна симуляции (стартовые законы - из CONDITIONS_START; для COUNTRY_DEFAULT их нет)
+    # - laws_timeline - очередь законов на изменение (формат - см build_sim())
+    
+    # расписание - кусочно-постоянная функция от дня симуляции: 
+    # отрезок (LawSegment) начинается в день изменения законов и хранит бонусы строительства, штраф ТНП 
+    # и строку с изменениями законов (для подробной печати)
+    # => в основном цикле симуляции нет ни имен законов, ни поиска по LAWS_MODIFICATORS
+    
+    # расписание проверяется один раз - при компиляции - и не меняется => одно расписание можно использовать во всех симуляциях 
+    # (например, в симуляциях одного перебора: см get_law_schedule())
+
+# отрезок расписания: 
+# - day - день изменения законов (от начала симуляции)
+# - build_bonus - бонусы строительства: кортеж пар (тип объекта, бонус) по всем типам из OBJ_COST
+# - cons_goods_penalty - штраф ТНП
+# - cons_goods_changed - был ли в этот день изменен закон на ТНП (=> меняется распределение фабрик по линиям)
+# - laws_str - изменения законов и действующие законы (для подробной печати)
+LawSegment = namedtuple('LawSegment', ['day', 'build_bonus', 'cons_goods_penalty', 'cons_goods_changed', 'laws_str'])
+
+class LawSchedule():
+    
+    def __init__(self, country, laws_timeline):
+        
+        if country in CONDITIONS_START:
+            laws_timeline = CONDITIONS_START[country]['laws_start'] + list(laws_timeline)
+        
+        self.country = country 
+        self.laws_timeline = freeze_value(laws_timeline) # очередь законов со стартовыми - для ключа сценария (см get_scenario())
+        
+        laws_current = {} # набор действующих законов: law_tag:law 
+        segments = []
+        
+        for date_to_change_law, laws_to_change in self.laws_timeline:
+            
+            date_exception = ValueError('Упс! {0} - некорректное значение для даты изменения законов!'.format(date_to_change_law)) 
+            try:
+                day = get_days_diff(GAME_START, date_to_change_law)
+            except:
+                raise date_exception
+            
+            if not isinstance(day, int) or day <= 0: 
+                raise date_exception
+            if segments and day <= segments[-1].day: # иначе в симуляции изменения законов, начиная с этого дня, не произойдут
+                raise ValueError('Упс! {0} - даты изменения законов должны идти по возрастанию!'.format(date_to_change_law))
+            
+            cons_goods_changed, laws_str = False, ''
+            
+            for law in laws_to_change:
+                
+                law_tag = LAWS_MODIFICATORS.get(law, {}).get('tag')
+                if law_tag is None:
+                    raise ValueError('%s - некорректное имя закона! Закон не из LAWS_MODIFICATORS!' %law) 
+                
+                law_old = laws_current.get(law_tag, 'None (1е изменение)')
+                laws_str += 'Закон был изменен: %s -> %s (%s)\n' %(law_old, law, law_tag)
+                
+                laws_current[law_tag] = law
+                
+                if law_tag == 'econ':
+                    cons_goods_changed = True
+            
+            laws_str += BuildSimulator.str_2 + '\n' 
+            laws_str += 'Действующие законы:\n'
+            for law_tag, law in laws_current.items():
+                laws_str += '%s: %s\n' %(law_tag, law)
+            
+            if not laws_current:
+                raise ValueError('Упс! В наборе действующих законов нет ни одного закона!')
+            
+            cons_goods_law = laws_current.get('econ') 
+            if cons_goods_law is None:
+                raise ValueError('Упс! В наборе действующих законов нет закона на ТНП!') 
+            
+            # замечание: бонусы суммируются в том же порядке, что и раньше в симуляции - по порядку законов в laws_current 
+            # (сумма float зависит от порядка)
+            build_bonus = []
+            for obj_type in OBJ_COST:
+                obj_bonus = 1
+                for law in laws_current.values():
+                    obj_bonus += LAWS_MODIFICATORS[law][obj_type]
+                build_bonus.append((obj_type, obj_bonus))
+            
+            cons_goods_penalty = LAWS_MODIFICATORS[cons_goods_law]['cons_goods_penalty']
+            segments.append(LawSegment(day, tuple(build_bonus), cons_goods_penalty, cons_goods_changed, laws_str))
+        
+        self.segments = tuple(segments)
+    
+    def __deepcopy__(self, memo): # расписание не меняется => копия не нужна (например, в save_state())
+        return self
+    
+    def get_day(self, segment_idx):
+        # день начала отрезка segment_idx (-1 - индикатор: отрезков больше нет, законов на смену не осталось)
+        
+        if segment_idx < len(self.segments):
+            return self.segments[segment_idx].day
+        return -1
+
+# =====================================================
+# класс ResultCache - LRU-кэш результатов симуляций (см BuildSimulator.result_cache):
+
+    # аргументы для инициализации: 
+    # - maxsize - максимальное количество сценариев в кэше (int > 0)
+    #   при переполнении из кэша уходит сценарий, который дольше всех не запрашивали
+    
+    # ключ сценария - см BuildSimulator.get_scenario()
+    # результат сценария хранится неизменяемым: build_log - кортеж кортежей, obj_built - копия
+    # счетчики hits/misses - количество найденных/не найденных в кэше сценариев
+
+def freeze_value(value):
+    # неизменяемая (hashable) каноническая форма значения для ключа сценария: 
+    # списки => кортежи, словари => кортежи пар, отсортированные по ключу
+    
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze_value(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, deque)):
+        return tuple(freeze_value(item) for item in value)
+    return value
+
+class ResultCache():
+    
+    def __init__(self, maxsize=128):
+        
+        if not isinstance(maxsize, int) or maxsize <= 0:
+            raise ValueError("%s - некорректное значение для размера кэша!" %maxsize)
+        
+        self.maxsize = maxsize
+        self.lock = threading.Lock() # кэш может быть общим для симуляций в пуле потоков
+        self.clear()
+        
+    def clear(self):
+        with self.lock:
+            self.results = OrderedDict() # ключ сценария:(build_log, obj_built) - от давно запрошенных к недавним
+            self.hits = 0
+            self.misses = 0
+    
+    def __len__(self):
+        return len(self.results)
+    
+    def __str__(self):
+        return 'Кэш результатов: найдено = %i, не найдено = %i, сценариев = %i (максимум = %i)' %(self.hits, self.misses, len(self), self.maxsize)
+    
+    def get(self, key):
+        # результат сценария (build_log, obj_built) или None, если сценария нет в кэше
+        
+        with self.lock:
+            result = self.results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            
+            self.results.move_to_end(key)
+            self.hits += 1
+            return result
+        
+    def put(self, key, build_log, obj_built):
+        
+        result = (tuple(tuple(log_entry) for log_entry in build_log), deepcopy(obj_built))
+        
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            if len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+        
+        return result
+
+# =====================================================
+# класс ResultStore - хранилище результатов симуляций на диске (SQLite, см BuildSimulator.result_store):
+
+    # аргументы для инициализации: 
+    # - path - путь к файлу базы (создается, если его нет)
+    
+    # хранилище общее для разных запусков: сценарий, посчитанный ранее в другом процессе, не симулируется повторно
+    # записи привязаны к версии игровых констант (см get_constants_version()) 
+    # => после изменения констант в simulator.py старые записи не используются и удаляются при открытии хранилища
+    # интерфейс - как у ResultCache: get(), put(), clear(), счетчики hits/misses
+
+def get_constants_version():
+    # версия игровых констант - хэш всех констант, от которых зависят результаты симуляций
+    
+    constants = (OBJ_COST, LAWS_MODIFICATORS, CONDITIONS_START, CELLS_DICT, GAME_START, Cell.INFRASTR_DEFAULT)
+    return hashlib.sha256(repr(freeze_value(constants)).encode()).hexdigest()
+
+def get_scenario_hash(scenario_key):
+    # ключ сценария для хранилища: repr() ключа одинаков в разных процессах (в ключе - только строки, числа и кортежи)
+    return hashlib.sha256(repr(scenario_key).encode()).hexdigest()
+
+class ResultStore():
+    
+    def __init__(self, path):
+        
+        self.path = path
+        self.version = get_constants_version()
+        
+        self.local = threading.local() # у каждого потока - свое соединение с базой
+        self.lock = threading.Lock() # для счетчиков
+        self.hits = 0
+        self.misses = 0
+        
+        with self.connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS results (scenario TEXT PRIMARY KEY, version TEXT, build_log TEXT, obj_built TEXT)')
+            connection.execute('DELETE FROM results WHERE version != ?', (self.version,))
+    
+    def __getstate__(self): # для пула процессов (см map_build_sim()): в процесс передается только путь к базе
+        return {'path': self.path}
+    
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+    
+    def connect(self):
+        
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=60) # ждем, пока другой процесс закончит запись
+            connection.execute('PRAGMA journal_mode=WAL') # чтение не блокируется записью из других процессов
+            self.local.connection = connection
+        return connection
+    
+    def clear(self):
+        with self.connect() as connection:
+            connection.execute('DELETE FROM results')
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+    
+    def __len__(self):
+        return self.connect().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    
+    def __str__(self):
+        return 'Хранилище результатов (%s): найдено = %i, не найдено = %i, сценариев = %i' %(self.path, self.hits, self.misses, len(self))
+    
+    def get(self, key):
+        # результат сценария (build_log, obj_built) или None, если сценария нет в хранилище
+        
+        query = 'SELECT build_log, obj_built FROM results WHERE scenario = ? AND version = ?'
+        row = self.connect().execute(query, (get_scenario_hash(key), self.version)).fetchone()
+        
+        with self.lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        
+        build_log, obj_built = row
+        return tuple(tuple(log_entry) for log_entry in json.loads(build_log)), json.loads(obj_built)
+    
+    def put(self, key, build_log, obj_built):
+        
+        result = (tuple(tuple(log_entry) for log_entry in build_log), deepcopy(obj_built))
+        
+        with self.connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', 
+                               (get_scenario_hash(key), self.version, json.dumps(result[0], ensure_ascii=False), json.dumps(result[1], ensure_ascii=False)))
+        
+        return result
+
+# =====================================================
+# файл снимка - компактный двоичный формат для снимков состояния симуляции и прогресса переборов:
+
+    # файл: заголовок (STATE_FILE_MAGIC, версия формата, версия игровых констант - см get_constants_version())
+    # + сжатое (zlib) значение: None, bool, int, float, str, bytes и вложенные list/tuple/dict из них - в формате marshal 
+    # (версия marshal задана явно - STATE_FILE_MARSHAL_VERSION; в отличие от pickle, при чтении не создаются объекты классов)
+    # таблицы из сотен записей (ячейки, линии, очередь) - по столбцам, см pack_columns()
+
+    # снимок симуляции в файле - только то, из чего состояние однозначно восстанавливается (см BuildSimulator.encode_state()):
+    # ячейки - только отличающиеся от стартовых (CELLS_DICT), расписание законов - очередью законов, лог - столбцами
+    # => в отличие от pickle экземпляра симуляции, в файле нет ни неизменных ячеек, ни скомпилированного расписания
+
+    # файл записывается атомарно (сначала во временный файл) => прерванная запись не портит предыдущий снимок
+    # файл с другой версией формата или констант не читается (ValueError)
+# =====================================================
+
+STATE_FILE_MAGIC = b'HOI4SIM'
+STATE_FILE_VERSION = 1
+STATE_FILE_MARSHAL_VERSION = 4 # формат marshal, который пишется в файл (читаются все версии)
+
+def pack_columns(rows, columns_num):
+    # таблица (записи одинаковой длины columns_num) - по столбцам: целые и float - массивом numpy в байтах, строки - одной строкой через '\0'
+    # (столбец со значениями разных типов - списком как есть)
+    # => вместо значения на каждое поле каждой записи - несколько значений на таблицу (ячейки, линии, очередь - сотни записей)
+
+    columns = []
+    for column in zip(*rows) if rows else [()] * columns_num: # пустая таблица => пустые столбцы
+        column_types = {type(value) for value in column}
+        if column_types == {int}:
+            columns.append(('i', np.array(column, dtype='<i8').tobytes()))
+        elif column_types == {float}:
+            columns.append(('d', np.array(column, dtype='<f8').tobytes()))
+        elif column_types == {str} and not any('\0' in value for value in column):
+            columns.append(('s', '\0'.join(column)))
+        else:
+            columns.append(('v', list(column)))
+
+    return columns
+
+def unpack_columns(columns):
+    # столбцы таблицы pack_columns() - списки значений (записи - zip(*столбцы))
+
+    columns_unpacked = []
+    for column_type, data in columns:
+        if column_type == 'i':
+            data = np.frombuffer(data, dtype='<i8').tolist()
+        elif column_type == 'd':
+            data = np.frombuffer(data, dtype='<f8').tolist()
+        elif column_type == 's':
+            data = data.split('\0')
+        columns_unpacked.append(data)
+
+    return columns_unpacked
+
+state_file_header = None # заголовок файла снимка (см get_state_file_header())
+
+def get_state_file_header():
+    # заголовок файла снимка: версия констант считается один раз за процесс - при первой записи/чтении файла 
+    # (константы задаются в simulator.py до запуска симуляций; хэш констант дороже чтения небольшого снимка)
+    
+    global state_file_header
+    if state_file_header is None:
+        state_file_header = STATE_FILE_MAGIC + struct.pack('<H', STATE_FILE_VERSION) + bytes.fromhex(get_constants_version())
+    return state_file_header
+
+def write_state_file(path, value):
+    # запись значения в файл снимка path (атомарно: файл либо старый, либо новый целиком)
+
+    try:
+        data = marshal.dumps(value, STATE_FILE_MARSHAL_VERSION)
+    except ValueError: # например, numpy-число или объект класса
+        raise ValueError('Упс! В снимке есть значение, которое нельзя записать в файл снимка (только числа, строки, байты, списки и словари)!')
+
+    path_tmp = path + '.tmp'
+    with open(path_tmp, 'wb') as file:
+        file.write(get_state_file_header() + zlib.compress(data))
+    os.replace(path_tmp, path)
+
+def read_state_file(path):
+    # значение из файла снимка path (с проверкой формата и версий)
+
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    header = get_state_file_header()
+    if not data.startswith(STATE_FILE_MAGIC):
+        raise ValueError('Упс! %s - не файл снимка симуляции!' %path)
+    if data[:len(STATE_FILE_MAGIC) + 2] != header[:len(STATE_FILE_MAGIC) + 2]:
+        raise ValueError('Упс! %s - файл снимка другой версии формата: %i (нужна %i)!' %(path, struct.unpack_from('<H', data, len(STATE_FILE_MAGIC))[0], STATE_FILE_VERSION))
+    if data[:len(header)] != header:
+        raise ValueError('Упс! %s - снимок сделан при других игровых константах!' %path)
+
+    try:
+        return marshal.loads(zlib.decompress(data[len(header):]))
+    except (zlib.error, ValueError, EOFError, TypeError):
+        raise ValueError('Упс! %s - файл снимка поврежден!' %path)
+
+# класс SweepCheckpoint - прогресс перебора в файле снимка (см find_mil_extremum(), visualize_equilibrium()):
+
+    # аргументы для инициализации:
+    # - path - путь к файлу прогресса (None - прогресс не сохраняется: put() и remove() ничего не делают)
+    # - sweep_key - параметры перебора (числа, строки и кортежи): прогресс другого перебора не используется
+
+    # перебор записывает прогресс после каждой симуляции/блока (put()) и удаляет файл по завершении (remove())
+    # => перебор, прерванный на середине, при повторном запуске с тем же path продолжается с места остановки
+
+class SweepCheckpoint():
+
+    def __init__(self, path, sweep_key):
+
+        self.path = path
+        self.sweep_hash = get_scenario_hash(freeze_value(sweep_key))
+        self.values = {} # прогресс перебора: имя:значение (значения - как в файле снимка)
+
+        if path is None or not os.path.exists(path):
+            return
+
+        try:
+            data = read_state_file(path)
+        except ValueError as error: # например, константы изменились => прогресс недействителен
+            print('%s\nПеребор начинается заново.' %error)
+            return
+
+        if data.get('sweep') == self.sweep_hash: # иначе - прогресс другого перебора (файл будет перезаписан)
+            self.values = data['values']
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    def put(self, **values):
+
+        if self.path is None:
+            return
+
+        self.values.update(values)
+        write_state_file(self.path, {'sweep': self.sweep_hash, 'values': self.values})
+
+    def remove(self):
+
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        self.values = {}
+
+# =====================================================
+# события симуляции - для потокового режима (см BuildSimulator.build_sim_iter()):
+
+    # события выдаются по мере того, как симуляция до них доходит => потребитель может остановиться досрочно 
+    # (например, когда известен день 1го воензавода) или считать итоги на лету - без build_log
+# =====================================================
+
+# изменение законов: бонусы строительства и штраф ТНП - уже новые, laws_str - как в подробной печати
+LawEvent = namedtuple('LawEvent', ['day', 'laws_str', 'build_bonus', 'cons_goods_penalty'])
+
+# постройка объекта: та же пара, что и в build_log
+BuildEvent = namedtuple('BuildEvent', ['day', 'obj_type'])
+
+# завершение симуляции: копия построенных объектов
+EndEvent = namedtuple('EndEvent', ['day', 'obj_built'])
+
+# =====================================================
+# класс BuildLog - лог построенных объектов по столбцам (вместо списка пар (день, тип постройки)):
+
+    # аргументы для инициализации: 
+    # - build_log - лог build_sim() (в тч из кэша или map_build_sim()) или события build_sim_iter()
+    
+    # столбцы (numpy): days - дни постройки, obj_codes - коды типов построек (номер в BuildLog.obj_types) 
+    # + накопленные по типам количества и суммы дней постройки => запросы к логу - бинпоиск по дням и префиксные суммы:
+    # - get_count() - сколько объектов типа построено к дню day 
+    # - get_first_day() - день постройки 1го объекта типа
+    # - get_obj_days() - объекто-дни к дню day (например, сколько фабрико-дней наработали построенные фабрики)
+    # day в запросах - число или массив дней (много дат отсечки - одним вызовом)
+    
+    # итерация по BuildLog - те же пары (день, тип постройки), что и в обычном логе (с (день, 'end') в конце) 
+# =====================================================
+
+class BuildLog():
+    
+    obj_types = tuple(OBJ_COST) # коды типов построек - номера в obj_types
+    
+    def __init__(self, build_log):
+        
+        days, obj_codes = [], []
+        self.day_end = None # день завершения симуляции (None - в логе его нет)
+        
+        for log_entry in build_log:
+            day, obj_type = log_entry[:2]
+            if isinstance(log_entry, EndEvent) or obj_type == 'end':
+                self.day_end = day
+            elif obj_type in self.obj_types: # события LawEvent пропускаются
+                days.append(day)
+                obj_codes.append(self.obj_types.index(obj_type))
+        
+        self.days = np.array(days, dtype=np.int64)
+        self.obj_codes = np.array(obj_codes, dtype=np.int8)
+        
+        # накопленные по типам значения: строка i - по первым i записям лога
+        is_obj_type = (self.obj_codes[:, None] == np.arange(len(self.obj_types))).astype(np.int64)
+        self.counts_total = np.vstack([np.zeros((1, len(self.obj_types)), dtype=np.int64), np.cumsum(is_obj_type, axis=0)])
+        self.days_total = np.vstack([np.zeros((1, len(self.obj_types)), dtype=np.int64), np.cumsum(is_obj_type * self.days[:, None], axis=0)])
+    
+    @classmethod
+    def from_log(cls, build_log): # лог как BuildLog (уже BuildLog - как есть)
+        if isinstance(build_log, cls):
+            return build_log
+        return cls(build_log)
+    
+    def __len__(self): # как у обычного лога - с записью 'end'
+        return len(self.days) + (self.day_end is not None)
+    
+    def __iter__(self):
+        for day, obj_code in zip(self.days.tolist(), self.obj_codes.tolist()):
+            yield (day, self.obj_types[obj_code])
+        if self.day_end is not None:
+            yield (self.day_end, 'end')
+    
+    def __eq__(self, other): # сравнение с BuildLog или обычным логом
+        return list(self) == [tuple(log_entry) for log_entry in other]
+    
+    def get_entries_num(self, day): # количество записей лога по день day включительно (дни лога не убывают)
+        if day is None:
+            return len(self.days)
+        return np.searchsorted(self.days, day, side='right')
+    
+    def get_count(self, obj_type, day=None):
+        # количество объектов obj_type, построенных к дню day включительно (None - за всю симуляцию)
+        return self.counts_total[self.get_entries_num(day), self.obj_types.index(obj_type)]
+    
+    def get_first_day(self, obj_type):
+        # день постройки 1го объекта obj_type (None - не построено ни одного)
+        entries_num = np.searchsorted(self.counts_total[:, self.obj_types.index(obj_type)], 1)
+        if entries_num > len(self.days):
+            return None
+        return int(self.days[entries_num - 1])
+    
+    def get_days(self, obj_type):
+        # дни постройки объектов obj_type
+        return self.days[self.obj_codes == self.obj_types.index(obj_type)]
+    
+    def get_obj_days(self, obj_type, day):
+        # объекто-дни к дню day: сумма (day - день постройки) по объектам obj_type, построенным к этому дню
+        entries_num = self.get_entries_num(day)
+        obj_code = self.obj_types.index(obj_type)
+        return self.counts_total[entries_num, obj_code] * np.asarray(day) - self.days_total[entries_num, obj_code]
+
 # =====================================================
 # основной класс BuildSimulator - симулятор строительства:
 
@@ -252,6 +1020,8 @@ class Cell():
     
         # - симуляция строительства по заданным параметрам: метод build_sim()
         # (с краткой или подробной печатью событий симуляции)
+        
+        # - та же симуляция в потоковом режиме - события по мере их появления: метод build_sim_iter()
 
     # --------------------------------------------
     # - параметры приложений симуляции, которые задаются пользователем:
@@ -281,6 +1051,62 @@ class BuildSimulator():
     # переключатель краткой/подробной печати: 
     printout = False
     
+    # переключатель тихого режима: True - симуляция ничего не печатает (см print_sim())
+    quiet = False
+    
+    # поток для печати симуляции (None - sys.stdout) 
+    output_stream = None
+    
+    # инфраструктура по умолчанию для новых ячеек симуляции 
+    # (классы-наследники задают свое значение в build_sim() - для экземпляра класса, а не для Cell)
+    infr_default = Cell.INFRASTR_DEFAULT
+    
+    # поля экземпляра класса, составляющие состояние симуляции (см save_state()):
+    state_fields = ('progress', 'law_schedule', 'law_segment_idx', 'build_order', 'build_order_source', 'cells_dict', 'obj_built', 
+                    'day', 'day_end', 'day_to_change_law', 'civ_trade_av', 'cons_goods_penalty', 'civ_for_lines', 'build_bonus', 'build_log', 
+                    'generic_number', 'generic_cells', 'infr_default')
+    
+    # поля экземпляра класса, которые передаются симуляциям в пуле (см map_build_sim()):
+    worker_settings = ('printout', 'event_driven', 'result_store', 'log_columnar', 'fixed_point')
+    
+    # переключатель пула для параллельных симуляций (см get_executor()): 
+    # False - пул процессов, True - пул потоков
+    pool_threads = False
+    
+    # кэш результатов build_sim() (общий для всех экземпляров класса и классов-наследников): 
+    # None - без кэша; ResultCache(maxsize) - повторный сценарий не симулируется, а берется из кэша
+    # замечание: с кэшем build_sim() возвращает build_log неизменяемым - кортежем кортежей
+    result_cache = None
+    
+    # хранилище результатов build_sim() на диске - для повторных сценариев из других запусков: 
+    # None - без хранилища; ResultStore(path) - сценарий ищется в кэше, затем в хранилище (см run_cached_sim())
+    result_store = None
+    
+    # переключатель движка симуляции: 
+    # False - по дням (каждый игровой день обрабатывается отдельно)
+    # True - по событиям (от события к событию: изменение закона, постройка объекта, date_end)
+    event_driven = False
+    
+    # переключатель формата лога, который возвращает build_sim(): 
+    # False - список пар (день, тип постройки); True - BuildLog (по столбцам, с запросами по дням)
+    log_columnar = False
+    
+    # переключатель арифметики прогресса: 
+    # False - float (прогресс накапливается сложением float по дням)
+    # True - фиксированная точка: прогресс, стоимость объектов и прогресс за день - целые (в 1/FIXED_POINT_SCALE очка строительства)
+    # => точный день постройки без прохода по дням в движке по событиям и одинаковый результат на любой платформе
+    fixed_point = False
+    
+    # переключатель контрольных точек по законам: 
+    # True - build_sim() запоминает снимки состояния в дни изменения законов (см run_sim_from_law_checkpoint()) 
+    # => повторный build_sim() с теми же параметрами, но измененным laws_timeline, продолжается с последнего дня, 
+    # до которого расписание законов не изменилось (результат - тот же, что и с 1го дня)
+    law_checkpoints = False
+    
+    # переключатель потокового режима (устанавливается только на время build_sim_iter()): 
+    # True - build_sim() вместо запуска симуляции возвращает генератор ее событий
+    stream_events = False
+    
     # вариант:
         # поле INFINITE_LOOP_BREAKER - служебная константа: 
         # значение по умолчанию для дня от начала симуляции, когда она принудительно завершится (если это не произошло ранее)
@@ -294,6 +1120,7 @@ class BuildSimulator():
     def __init__(self, country_start):
 
         self.reset() # на всякий случай, хотя - вообще говоря, reset() есть на старте каждой симуляции
+        self.law_checkpoints_last = None # контрольные точки последней симуляции (см run_sim_from_law_checkpoint()) - в reset() не сбрасываются
         
         if isinstance(country_start, str) and country_start in CONDITIONS_START: # CONDITIONS_START.get(country_start):
             self.country = country_start # страна симуляции
@@ -318,16 +1145,26 @@ class BuildSimulator():
 
     def reset(self):
         self.reset_obj_built()
-        self.progress = [] # прогресс линий строительства
-        self.laws_current = {} # набор действующих законов
+        self.progress = [] # прогресс линий строительства (см ProgressLine)
+        self.progress_per_day = None # кэш изменения прогресса линий за день (см get_progress_per_day_list())
         
-        self.laws_timeline = [] # актуальное состояние очереди законов на изменение
-        self.build_order = [] # актуальное состояние очереди строительства
+        self.law_schedule = None # расписание законов (см LawSchedule)
+        self.law_segment_idx = 0 # номер следующего отрезка расписания законов
+        self.build_order = deque() # актуальное состояние очереди строительства (уже взятые из источника элементы)
+                                   # deque - элементы берутся из начала и возвращаются в начало (см progress_change_lines_num())
+        self.build_order_source = None # ленивый источник остальной очереди (см BuildOrderRuns, BuildOrderSource)
 
         self.cells_dict = {} # актуальное состояние ячеек строительства
         for cell_name, value in CELLS_DICT.items():
           self.cells_dict[cell_name] = Cell(cell_name, *value)
         
+        self.cells_copied = None # ячейки, скопированные после последнего снимка состояния (None - снимков не было => все ячейки свои) - см get_own_cell()
+        
+        self.generic_number = 1 # номер для имени следующей generic-ячейки симуляции
+        self.generic_cells = [] # общие generic-ячейки: (номер первой generic-ячейки, ячейка) - см get_cell()
+        self.scenario = None # сценарий симуляции для кэша и хранилища результатов (см get_scenario())
+        self.law_checkpoints_taken = None # контрольные точки текущей симуляции (None - не запоминаются, см run_sim_iter())
+        
     def reset_obj_built(self): # сделано отдельно - под классы-наследники - с другой структурой self.obj_built
         self.obj_built = {'infr':0, 'civ':0, 'mil':0} # количество построенных в симуляции объектов
 
@@ -335,42 +1172,20 @@ class BuildSimulator():
     # бонусы строительства:
     # -----------------------------------------------------
 
-    def get_build_bonus(self): 
+    def get_build_bonus(self, law_segment): 
         # build_bonus - бонус скорости строительства объектов, зависящий от законов, технологий и советников 
-        # build_bonus изменяется при изменении закона
-
-        laws_current = self.laws_current.values()
-
-        if not len(laws_current):
-            raise ValueError('Упс! В наборе действующих законов нет ни одного закона!')
-            
-        build_bonus = {}
+        # build_bonus изменяется при изменении закона - берется из отрезка расписания законов law_segment (см LawSchedule)
+        
+        # замечание: 
+        # возвращается новый словарь (по типам объектов симуляции), тк print_output() округляет build_bonus на месте
 
-        for obj_type in self.obj_built:
-          
-            build_bonus[obj_type] = 1 
-            for law in laws_current:
-                 build_bonus[obj_type] += LAWS_MODIFICATORS[law][obj_type] # исходя из change_laws_current, краша быть не может:
-                                                                           # laws_current заполняется только корректными законами - из LAWS_MODIFICATORS     
-        return build_bonus
+        build_bonus = dict(law_segment.build_bonus)
+        return {obj_type: build_bonus[obj_type] for obj_type in self.obj_built}
 
     # -----------------------------------------------------
-    # штраф ТНП и фабрики, доступные для строительства:
+    # фабрики, доступные для строительства:
     # -----------------------------------------------------
 
-    def get_cons_goods_penalty(self): 
-        # cons_goods_penalty - штраф ТНП
-        # cons_goods_penalty изменяется при изменении закона, если закон - на изменение ТНП, т.е с law_tag == 'econ' 
-
-        cons_goods_law = self.laws_current.get('econ') # => None, если такого закона нет 
-                                                       # (можно ввести константу: CONS_GOODS_TAG = 'econ', но и так сойдет)
-        if cons_goods_law is None:
-            raise ValueError('Упс! В наборе действующих законов нет закона на ТНП!') 
-
-        cons_goods_penalty = LAWS_MODIFICATORS[cons_goods_law]['cons_goods_penalty'] # исходя из change_laws_current, краша быть не может
-        return cons_goods_penalty 
-            
-
     def get_civ_available(self, cons_goods_penalty, civ_trade_av):
         # сiv_available - количество доступных для строительства фабрики - тех, которые миновали штраф ТНП
         # civ_available изменяется при изменении закона, влияющего на ТНП, а также при постройке объекта - не инфраструктуры
@@ -405,71 +1220,86 @@ class BuildSimulator():
     # изменение законов:
     # -----------------------------------------------------
 
+    def get_law_schedule(self, laws_timeline):
+        # расписание законов симуляции по laws_timeline (см LawSchedule)
+        # laws_timeline может быть уже скомпилированным расписанием - тогда оно используется как есть 
+        # (так одно расписание можно передать во все симуляции перебора)
+        
+        if not isinstance(laws_timeline, LawSchedule):
+            return LawSchedule(self.country, laws_timeline)
+        
+        if laws_timeline.country != self.country:
+            raise ValueError('Упс! Расписание законов составлено для другой страны: %s!' %laws_timeline.country)
+        return laws_timeline
+
     def get_day_to_change_law(self): 
         # day_to_change_law - ближайший из дней изменения закона - от начала симуляции
         # day_to_change_law инициализируется на старте симуляции, а затем изменяется при изменении закона
-
-        if len(self.laws_timeline):
-            date_to_change_law = self.laws_timeline[0][0]
-            day_to_change_law = get_days_diff(GAME_START, date_to_change_law)
-        else:
-            day_to_change_law = -1 # индикатор: self.laws_timeline пуст, законов на смену не осталось
-        return day_to_change_law
+        # (-1 - индикатор: законов на смену не осталось)
+        
+        return self.law_schedule.get_day(self.law_segment_idx)
 
     def change_laws_current(self):
-        # изменение действующего набора законов self.laws_current и очереди законов на изменение self.laws_timeline
+        # переход к следующему отрезку расписания законов - возвращает этот отрезок (см LawSegment)
         # метод используется при изменении закона
 
-        laws_to_change = self.laws_timeline.pop(0)[1]
+        law_segment = self.law_schedule.segments[self.law_segment_idx]
+        self.law_segment_idx += 1
         
-        # is_cons_goods_law_changed - флаг: был ли изменен закон на изменение ТНП, т.е с law_tag = 'econ' 
-        is_cons_goods_law_changed, optional_str = False, ''
-
-        for law in laws_to_change:
-
-            law_tag = LAWS_MODIFICATORS.get(law, {}).get('tag')
-            
-            if law_tag is None:
-                raise ValueError('%s - некорректное имя закона! Закон не из LAWS_MODIFICATORS!' %law) 
-            
-            # --------------------------------------------
-            if self.printout:
-                law_old = self.laws_current.get(law_tag, 'None (1е изменение)')
-                optional_str += 'Закон был изменен: %s -> %s (%s)\n' %(law_old, law, law_tag)
-            # --------------------------------------------
-
-            self.laws_current[law_tag] = law
-
-            if law_tag == 'econ':
-                is_cons_goods_law_changed = True
-
-        # --------------------------------------------
-        if self.printout:
-            optional_str += self.str_2 + '\n' 
-            optional_str += 'Действующие законы:\n'
-            for law_tag, law in self.laws_current.items():
-                optional_str += '%s: %s\n' %(law_tag, law)
-        # --------------------------------------------
-        
-        return is_cons_goods_law_changed, optional_str
+        return law_segment
 
     # -----------------------------------------------------
     # изменение прогресса линий:
     # -----------------------------------------------------
     
-    def progress_add_new_line(self): 
-        # добавление новой линии в конец self.progress
-        # метод используется как вспомогательный для progress_shift_lines() и progress_change_lines_num()
+    def pull_build_order(self):
+        # следующий элемент ленивого источника очереди - в конец self.build_order (с проверкой, см check_build_order())
+        # возвращает False, если источника нет или он исчерпан
+        
+        if self.build_order_source is None:
+            return False
+        
+        order_item = next(self.build_order_source, None)
+        if order_item is None:
+            self.build_order_source = None
+            return False
+        
+        order_item = list(order_item) # элемент источника не трогаем (см BuildOrderSource)
+        self.expand_cells_dict([order_item])
+        self.check_build_order([order_item])
+        
+        self.build_order.append(order_item)
+        return True
+    
+    def get_build_order_len(self):
+        # длина очереди вместе с ленивым источником (sys.maxsize - бесконечная или заранее неизвестная)
+        
+        if self.build_order_source is None:
+            return len(self.build_order)
+        if isinstance(self.build_order_source, BuildOrderRuns):
+            return min(len(self.build_order) + len(self.build_order_source), sys.maxsize)
+        return sys.maxsize
+
+    def progress_add_new_line(self): 
+        # добавление новой линии в конец self.progress
+        # метод используется как вспомогательный для progress_shift_lines() и progress_change_lines_num()
 
-        if self.build_order: 
-            self.progress.append([self.build_order.pop(0), 0])
+        if self.build_order or self.pull_build_order(): 
+            self.progress.append(ProgressLine(*self.build_order.popleft()))
             
     def progress_shift_lines(self, line_data): 
         # удаление линии self.progress с данными line_data и добавление новой линии в конец - согласно механике игры
         # метод используется, когда в некоторой ячейке заканчивается очередь строительства
+        
+        # замечание: 
+        # линия с данными line_data уже завершена (num_to_build == 0) => удаляется позже, вместе с остальными завершенными - 
+        # одним проходом (см progress_remove_completed_lines()); порядок линий - тот же, что при удалении по одной
 
-        self.progress.remove(line_data)
         self.progress_add_new_line()  
+    
+    def progress_remove_completed_lines(self):
+        # удаление завершенных линий self.progress (num_to_build == 0) - за один проход вместо remove() по каждой
+        self.progress = [line_data for line_data in self.progress if line_data.num_to_build]
  
     def progress_change_lines_num(self, cons_goods_penalty, civ_trade_av): 
         # перераспределение линий self.progress - добавление новых или удаление имеющихся
@@ -481,7 +1311,7 @@ class BuildSimulator():
         
         if lines_num_diff < 0: # сценарий уменьшения числа линий 
             for __ in range(abs(lines_num_diff)):
-                self.build_order.insert(0, self.progress.pop()[0])
+                self.build_order.appendleft(self.progress.pop().get_order())
 
         elif lines_num_diff > 0: # сценарий увеличения числа линий
             for __ in range(lines_num_diff):
@@ -521,17 +1351,17 @@ class BuildSimulator():
         build_log_today = [] # список объектов, построенных в данный день
         lines_to_remove = [] # линии строительства для удаления
 
-        for line_idx, line_data in enumerate(deepcopy(self.progress)): # deepcopy на всякий случай - тк в цикле можем менять self.progress
-                                                                       # и вообще - в таких ситуациях это хорошая привычка 
-            cell_name, obj_type, num_to_build = line_data[0]
-            build_points = line_data[1]
-            cell = self.cells_dict[cell_name] # краша быть не может
+        for line_idx, line_data in enumerate(self.progress): # копия self.progress не нужна: в цикле меняются только поля линий, 
+                                                             # а завершенные линии удаляются после цикла
+            cell_name, obj_type = line_data.cell_name, line_data.obj_type
             
-            object_cost = OBJ_COST[obj_type]
-            is_object_completed = build_points >= object_cost
+            object_cost = self.get_object_cost(obj_type)
+            is_object_completed = line_data.build_points >= object_cost
             
             if is_object_completed:
               
+                cell = self.get_cell(cell_name) # краша быть не может; ячейка нужна только при постройке
+              
                 self.change_obj_built(obj_type, line_idx) # line_idx - под класс-наследник  
 
                 # --------------------------------------------
@@ -545,20 +1375,23 @@ class BuildSimulator():
                     optional_str += optional_str_inner
                 # --------------------------------------------
                 
-                num_to_build -= 1
-                self.progress[line_idx][0][-1] = num_to_build
+                line_data.num_to_build -= 1
 
-                if num_to_build == 0: # => изначальный num_to_build < 0 = бесконечная стройка на данной линии
-                    # lines_to_remove.append(line_data) # здесь тонко: надо понимать, что из себя представляет line_data
-                    lines_to_remove.append(self.progress[line_idx]) # лучше так => указывает на ТОТ ЖЕ список, что внутри self.progress => он гарантированно будет присутствовать при удалении
+                if line_data.num_to_build == 0: # => изначальный num_to_build < 0 = бесконечная стройка на данной линии
+                    lines_to_remove.append(line_data) # та же линия, что и в self.progress
                 else:
-                    self.progress[line_idx][1] -= object_cost # согласно механике игры: 
-                                                              # на незавершенной очереди в ячейке - сохраняем остаток прогресса 
+                    line_data.build_points -= object_cost # согласно механике игры: 
+                                                          # на незавершенной очереди в ячейке - сохраняем остаток прогресса 
+                    line_data.completion = None # прогресс изменился не по дням => день постройки - заново
                 if obj_type == 'infr':
-                    cell.infrastructure_up()
+                    self.get_own_cell(cell_name).infrastructure_up() # общую generic-ячейку менять нельзя
+                    for line_data_cell in self.progress: # бонус инфраструктуры ячейки изменился - у всех ее линий
+                        if line_data_cell.cell_name == cell_name:
+                            line_data_cell.infr_bonus = None
                 else:
                     is_not_infr_completed = True
-                    cell.obj_available_down()
+                    if cell.get_obj_available() != sys.maxsize: # ячейки без ограничения (в тч общие generic-ячейки) не меняются
+                        self.get_own_cell(cell_name).obj_available_down()
 
                 build_log_today.append(obj_type) 
 
@@ -566,6 +1399,9 @@ class BuildSimulator():
             # print(line_data)
             # print(self.progress)
             self.progress_shift_lines(line_data)
+        
+        if lines_to_remove:
+            self.progress_remove_completed_lines()
                 
         return is_not_infr_completed, optional_str, build_log_today
     
@@ -580,7 +1416,7 @@ class BuildSimulator():
         # замечание:
         # в данном случае: quit_trigger => конец строительства build_order => нет смысла продолжать симуляцию  
         
-        quit_trigger = not (len(self.build_order) + len(self.progress)) 
+        quit_trigger = not (self.build_order or self.progress or self.pull_build_order()) 
         quit_trigger_title = '(все стройки завершены)' 
         
         return quit_trigger, quit_trigger_title 
@@ -589,7 +1425,357 @@ class BuildSimulator():
         # метод, предназначенный для некоторой работы над полями экземляра класса внутри основного цикла
         # метод добавлен для использования в классах-наследниках
         pass
+
+    def day_start_optional_stuff(self):
+        # метод, предназначенный для некоторой работы над полями экземляра класса в начале каждого дня основного цикла
+        # (до изменения законов и чека постройки объектов)
+        # метод добавлен для использования в классах-наследниках
+        pass
+
+    def get_days_to_skip_limit(self):
+        # максимальное количество дней, на которое движок по событиям может продвинуть симуляцию за 1 шаг
+        # None - ограничения нет (everyday_optional_stuff ничего не делает или его работу за пропущенные дни выполняет skipped_days_optional_stuff())
+        # метод добавлен для использования в классах-наследниках
+        return None
+
+    def skipped_days_optional_stuff(self, days):
+        # работа everyday_optional_stuff за days дней, пропущенных движком по событиям (между событиями)
+        # метод добавлен для использования в классах-наследниках
+        pass
+
+    def is_event_driven(self):
+        # какой движок используется в текущей симуляции (см event_driven)
+        # метод добавлен для использования в классах-наследниках
+        return self.event_driven
       
+    def save_state(self):
+        # снимок состояния симуляции - все поля экземпляра класса, которые меняются в основном цикле (см state_fields):
+        # линии, очередь, законы (номер отрезка расписания), построенные объекты, ячейки, день и поля классов-наследников
+        # по снимку симуляцию можно продолжить с того же места: load_state() + run_sim()
+        # снимок берется в начале дня - до изменения законов (как в BuildSimMaxMilitary.day_start_optional_stuff())
+        
+        # замечание: 
+        # снимок - без deepcopy (см copy_state_value()): снимки могут браться хоть каждый день, а ячеек - сотни 
+        # => ячейки не копируются, а остаются общими со снимком до первого изменения (см get_own_cell())
+        
+        state = {field: self.copy_state_value(field, getattr(self, field)) for field in self.state_fields}
+        self.cells_copied = set() # все ячейки - общие со снимком
+        return state
+    
+    def load_state(self, state):
+        # восстановление состояния симуляции по снимку save_state()
+        # снимок можно использовать повторно - в симуляцию попадает его копия (ячейки - общие до первого изменения)
+        
+        for field, value in state.items():
+            setattr(self, field, self.copy_state_value(field, value))
+        
+        self.cells_copied = set() # все ячейки - общие со снимком
+        self.progress_per_day = None # кэш не входит в снимок => пересчитывается по восстановленному состоянию
+
+    def copy_state_value(self, field, value):
+        # копия значения поля состояния для снимка и восстановления - настолько глубокая, насколько поле меняется на месте
+        
+        if field == 'progress': # линии меняются на месте
+            return [line_data.copy() for line_data in value]
+        if field == 'cells_dict': # ячейки копируются при изменении (см get_own_cell())
+            return dict(value)
+        if field == 'build_order_source': # у источников - своя копия (см __deepcopy__())
+            return deepcopy(value)
+        if isinstance(value, dict): # obj_built, build_bonus и тп: значения - числа или списки чисел
+            return {key: copy(item) for key, item in value.items()}
+        if isinstance(value, (list, deque)): # элементы не меняются на месте: build_order, build_log, civ_for_lines, generic_cells
+            return copy(value)
+        return value # неизменяемые значения: числа, расписание законов (см LawSchedule)
+
+    # -----------------------------------------------------
+    # снимок состояния в файле:
+    # -----------------------------------------------------
+
+    def save_state_file(self, path, state=None):
+        # снимок состояния (state - снимок save_state(); None - текущее состояние) - в файл снимка path (см write_state_file())
+
+        if state is None:
+            state = self.save_state()
+
+        state_file = {'class': type(self).__qualname__, 'country_start': self.get_country_start(), 'fixed_point': self.fixed_point,
+                      'state': self.encode_state(state)}
+        write_state_file(path, state_file)
+
+    def load_state_file(self, path):
+        # восстановление состояния симуляции из файла save_state_file() => run_sim() - продолжение с того же дня
+        # (для повторных восстановлений без чтения файла - save_state() сразу после load_state_file())
+
+        state_file = read_state_file(path)
+
+        if (state_file['class'], state_file['country_start']) != (type(self).__qualname__, self.get_country_start()):
+            raise ValueError('Упс! %s - снимок другой симуляции: %s (%s)!' %(path, state_file['class'], state_file['country_start']))
+        if state_file['fixed_point'] != self.fixed_point:
+            raise ValueError('Упс! %s - снимок с другой арифметикой прогресса: fixed_point = %s!' %(path, state_file['fixed_point']))
+
+        for field, value in self.decode_state(state_file['state']).items(): # значения из файла - новые объекты => без копий load_state()
+            setattr(self, field, value)
+        
+        self.cells_copied = None # все ячейки - свои (общих со снимком нет)
+        self.progress_per_day = None
+
+    def encode_state(self, state):
+        # снимок save_state() => значение для файла снимка (только числа, строки, байты, списки и словари)
+
+        encoded = {}
+        for field, value in state.items():
+
+            if field == 'progress':
+                value = pack_columns([(line_data.cell_name, line_data.obj_type, line_data.num_to_build, line_data.build_points) for line_data in value], 4)
+            elif field == 'law_schedule' and value is not None: # очередь законов без стартовых (их добавит LawSchedule)
+                laws_start = CONDITIONS_START.get(value.country, {}).get('laws_start', [])
+                value = (value.country, value.laws_timeline[len(laws_start):])
+            elif field == 'build_order':
+                value = pack_columns(value, 3)
+            elif field == 'build_order_source' and value is not None:
+                if not isinstance(value, BuildOrderRuns): # элементы произвольного источника заранее неизвестны
+                    raise ValueError('Упс! Ленивый источник очереди (BuildOrderSource) нельзя записать в файл снимка!')
+                value = value.runs
+            elif field == 'cells_dict': # только ячейки, которые отличаются от стартовых (см reset())
+                value = pack_columns([(cell_name,) + self.get_cell_fields(cell) for cell_name, cell in value.items()
+                                      if cell_name not in CELLS_DICT or self.get_cell_fields(cell) != self.get_cell_fields(Cell(cell_name, *CELLS_DICT[cell_name]))], 4)
+            elif field == 'generic_cells':
+                value = pack_columns([(generic_number,) + self.get_cell_fields(cell) for generic_number, cell in value], 4)
+            elif field == 'build_log': # столбцами: дни и коды типов построек ('end' - последний код)
+                obj_types = BuildLog.obj_types + ('end',)
+                value = (np.array([day for day, __ in value], dtype='<i4').tobytes(), bytes(obj_types.index(obj_type) for __, obj_type in value))
+
+            encoded[field] = value
+        return encoded
+
+    def decode_state(self, encoded):
+        # значение из файла снимка (см encode_state()) => снимок для load_state()
+
+        state = {}
+        for field, value in encoded.items():
+
+            if field == 'progress':
+                value = list(map(ProgressLine, *unpack_columns(value)))
+            elif field == 'law_schedule' and value is not None: # расписание текущей симуляции с той же очередью законов - как есть
+                law_schedule = self.law_schedule
+                if law_schedule is None or self.encode_state({'law_schedule': law_schedule})['law_schedule'] != value:
+                    law_schedule = LawSchedule(*value)
+                value = law_schedule
+            elif field == 'build_order':
+                value = deque(map(list, zip(*unpack_columns(value))))
+            elif field == 'build_order_source' and value is not None:
+                value = BuildOrderRuns(value)
+            elif field == 'cells_dict':
+                cell_columns = unpack_columns(value)
+                value = {cell_name: Cell(cell_name, *cell_value) for cell_name, cell_value in CELLS_DICT.items()}
+                value.update(zip(cell_columns[0], map(Cell.from_fields, *cell_columns)))
+            elif field == 'generic_cells':
+                value = [(generic_number, Cell.from_fields(Cell.GENERIC_NAME_BASE + '0', *cell_fields)) for generic_number, *cell_fields in zip(*unpack_columns(value))]
+            elif field == 'build_log':
+                obj_types = BuildLog.obj_types + ('end',)
+                days, obj_codes = value
+                value = [(day, obj_types[obj_code]) for day, obj_code in zip(np.frombuffer(days, dtype='<i4').tolist(), obj_codes)]
+
+            state[field] = value
+        return state
+
+    def get_cell_fields(self, cell):
+        # поля ячейки для файла снимка (имя - отдельно)
+        return (cell.get_infrastructure(), cell.get_obj_available(), cell.get_country())
+
+    # -----------------------------------------------------
+    # прогресс переборов:
+    # -----------------------------------------------------
+
+    def get_sweep_checkpoint(self, checkpoint_path, *sweep_args):
+        # прогресс перебора в файле checkpoint_path (см SweepCheckpoint): перебор задается методом и его аргументами sweep_args
+        # + всем, от чего зависят результаты симуляций экземпляра (страна, арифметика прогресса, подробная печать)
+
+        sweep_key = (type(self).__qualname__, self.get_country_start(), self.fixed_point, self.printout) + sweep_args
+        return SweepCheckpoint(checkpoint_path, sweep_key)
+
+    # -----------------------------------------------------
+    # кэш и хранилище результатов:
+    # -----------------------------------------------------
+    
+    def get_result_cache(self):
+        # кэш для текущей симуляции (None - симуляция идет без кэша)
+        # метод добавлен для использования в классах-наследниках
+        return self.result_cache
+    
+    def get_result_store(self):
+        # хранилище для текущей симуляции (None - симуляция идет без хранилища)
+        # метод добавлен для использования в классах-наследниках
+        return self.result_store
+    
+    def get_scenario(self):
+        # сценарий симуляции - вызывается в build_sim() перед основным циклом, когда очередь строительства и законов уже собрана
+        # в сценарий входит все, от чего зависит результат: параметры симуляции и используемые ими записи констант
+        # словарь с неизменяемыми значениями => ключ сценария для кэша и хранилища - freeze_value(сценарий)
+        
+        build_order = self.build_order
+        cells_used = {line_data[0] for line_data in self.build_order}
+        
+        if self.build_order_source is not None:
+            build_order = (self.build_order, self.build_order_source.get_key())
+            cells_used |= self.build_order_source.get_cell_names()
+        
+        laws_used = {law for __, laws in self.law_schedule.laws_timeline for law in laws}
+        cells_used = {cell_name for cell_name in cells_used if cell_name in CELLS_DICT} # остальные ячейки задает infr_default
+        
+        scenario = {
+                     'class': type(self).__qualname__, 
+                     'country': self.country, 
+                     'obj_start': getattr(self, 'obj_start', None), 
+                     'infr_default': self.infr_default, 
+                     'build_order': build_order, 
+                     'laws_timeline': self.law_schedule.laws_timeline, 
+                     'civ_trade_av': self.civ_trade_av, 
+                     'day_end': self.day_end, 
+                     'printout': self.printout, # подробная печать округляет бонусы строительства (см print_output())
+                     'fixed_point': {True: FIXED_POINT_SCALE, False: None}[self.fixed_point], 
+                     
+                     'OBJ_COST': OBJ_COST, 
+                     'LAWS_MODIFICATORS': {law: LAWS_MODIFICATORS.get(law) for law in laws_used}, 
+                     'CONDITIONS_START': CONDITIONS_START.get(self.country), 
+                     'CELLS_DICT': {cell_name: CELLS_DICT[cell_name] for cell_name in cells_used}, 
+                     'INFRASTR_DEFAULT': Cell.INFRASTR_DEFAULT, 
+                    }
+        
+        return {key: freeze_value(value) for key, value in scenario.items()}
+    
+    def run_cached_sim(self, law_run_key=None):
+        # run_sim() с кэшем и хранилищем результатов: 
+        # сценарий self.scenario ищется сначала в кэше, затем в хранилище; не найден - симулируется и сохраняется в оба
+        # найден - состояние симуляции не меняется, но построенные объекты - как после симуляции
+        # law_run_key - симуляция с 1го дня с контрольными точками по законам (см run_sim_from_law_checkpoint())
+        
+        if self.stream_events: # потоковый режим - без кэша и хранилища (событий изменения законов в них нет)
+            return self.run_sim_iter(keep_log=False)
+        
+        result_cache = self.get_result_cache()
+        result_store = self.get_result_store()
+        
+        if self.scenario is None or (result_cache is None and result_store is None):
+            return self.get_build_log(self.run_sim_from_law_checkpoint(law_run_key))
+        
+        scenario_key = freeze_value(self.scenario)
+        result = None
+        
+        if result_cache is not None:
+            result = result_cache.get(scenario_key)
+        
+        if result is None and result_store is not None:
+            result = result_store.get(scenario_key)
+            if result is not None and result_cache is not None:
+                result_cache.put(scenario_key, *result)
+        
+        if result is None:
+            build_log = self.run_sim_from_law_checkpoint(law_run_key)
+            for storage in (result_cache, result_store):
+                if storage is not None:
+                    result = storage.put(scenario_key, build_log, self.obj_built)
+        else: 
+            self.obj_built = deepcopy(result[1])
+            self.print_sim('РЕЗУЛЬТАТ ИЗ КЭША: Построенные объекты: %s\n' %self.obj_built)
+        
+        return self.get_build_log(result[0])
+    
+    def get_build_log(self, build_log):
+        # лог для build_sim() - в формате по self.log_columnar
+        if self.log_columnar:
+            return BuildLog(build_log)
+        return build_log
+
+    # -----------------------------------------------------
+    # параллельные симуляции:
+    # -----------------------------------------------------
+
+    def get_country_start(self):
+        # аргумент для создания такого же экземпляра класса (в процессе пула - см map_build_sim())
+        
+        if self.country == COUNTRY_DEFAULT:
+            return self.obj_start
+        return self.country
+
+    def map_build_sim(self, sim_args_list, executor=None):
+        # build_sim() по каждому набору аргументов из sim_args_list:
+            # - executor is None - последовательно, в текущем процессе
+            # - иначе - в пуле executor (см get_executor()), печать симуляций - в том же порядке, что и без пула
+        # генератор: выдает (build_log, obj_built) в порядке sim_args_list
+        
+        if executor is None:
+            for sim_args in sim_args_list:
+                build_log = self.build_sim(*sim_args)
+                yield build_log, deepcopy(self.obj_built)
+            return
+        
+        settings = {name: getattr(self, name) for name in self.worker_settings}
+        tasks = [(type(self), self.get_country_start(), settings, sim_args) for sim_args in sim_args_list]
+        
+        for build_log, obj_built, output_str in executor.map(build_sim_worker, tasks):
+            self.print_sim(output_str, end='')
+            yield build_log, obj_built
+
+    # -----------------------------------------------------
+    # пакетные симуляции (numpy):
+    # -----------------------------------------------------
+    
+    # замечание: 
+    # пакетная симуляция (build_sim_batch() в классах-наследниках) ведет сразу много сценариев - день за днем, 
+    # храня прогресс линий, фабрики по линиям, бонусы и т.д. в массивах numpy (строка массива - сценарий);
+    # результат совпадает с build_sim() при printout == False (подробная печать округляет бонусы строительства)
+
+    def get_batch_scenarios(self, sim_args_list, defaults, country_start_list=None):
+        # подготовка сценариев пакетной симуляции:
+        # - sim_args - аргументы build_sim() сценария, опущенные аргументы (после 2х первых) берутся из defaults
+        # - country_start_list - стартовые условия сценариев (None - как у данного экземпляра класса)
+        # возвращает список (sim_args, экземпляр класса со стартовыми условиями сценария, расписание законов сценария)
+        # экземпляры класса и расписания законов - общие для сценариев с теми же стартовыми условиями и laws_timeline
+        
+        if country_start_list is None:
+            country_start_list = [self.get_country_start()] * len(sim_args_list)
+        
+        sims, law_schedules, scenarios = {}, {}, []
+        
+        for sim_args, country_start in zip(sim_args_list, country_start_list):
+            
+            sim_args = tuple(sim_args) + defaults[len(sim_args) - 2:]
+            laws_timeline = sim_args[2]
+            
+            start_key = repr(country_start)
+            if start_key not in sims:
+                sims[start_key] = type(self)(country_start)
+            sim = sims[start_key]
+            
+            schedule_key = (start_key, id(laws_timeline)) # laws_timeline живут в sim_args_list => id не повторяются
+            if schedule_key not in law_schedules:
+                if isinstance(laws_timeline, str) and laws_timeline == 'no_changes': 
+                    laws_timeline = []
+                law_schedules[schedule_key] = sim.get_law_schedule(laws_timeline)
+            
+            scenarios.append((sim_args, sim, law_schedules[schedule_key]))
+        
+        return scenarios
+    
+    def get_batch_law_events(self, law_schedule_list):
+        # изменения законов пакетной симуляции - по расписаниям законов сценариев: 
+        # словарь день:[(номера сценариев - массив numpy, отрезок расписания), ...]
+        
+        rows_by_schedule = {}
+        for row, law_schedule in enumerate(law_schedule_list):
+            rows_by_schedule.setdefault(id(law_schedule), (law_schedule, []))[1].append(row)
+        
+        law_events = {}
+        for law_schedule, rows in rows_by_schedule.values():
+            
+            if law_schedule.get_day(0) != 1:
+                raise ValueError('Упс! Стартовые законы не определены!')
+            
+            for law_segment in law_schedule.segments:
+                law_events.setdefault(law_segment.day, []).append((np.array(rows), law_segment))
+        
+        return law_events
+
     def print_cell_dict_debug(self): 
         # служебная функция - для дебага
         # отображает текущее состояние self.cells_dict
@@ -597,6 +1783,129 @@ class BuildSimulator():
         for cell in self.cells_dict.values():
             print(cell)
       
+    # -----------------------------------------------------
+    # прогресс линий и движок по событиям:
+    # -----------------------------------------------------
+
+    def get_progress_per_day(self, line_data, build_bonus, civ_num):
+        # progress_per_day - изменение прогресса линии за день
+        # progress_per_day изменяется при изменении закона, постройке объекта или перераспределении линий
+
+        obj_type = line_data.obj_type
+        infr_bonus = line_data.infr_bonus # ячейка ищется только при пустом кэше линии (см ProgressLine)
+        
+        if infr_bonus is None:
+            cell = self.get_cell(line_data.cell_name)
+            cell_infrastructure = cell.get_infrastructure()
+            infr_bonus = {True:1, False:(10 + cell_infrastructure) / 10}[obj_type == 'infr']
+            line_data.infr_bonus = infr_bonus
+        
+        return self.to_progress_units(5 * build_bonus[obj_type] * infr_bonus * civ_num)
+
+    def to_progress_units(self, build_points):
+        # очки строительства (float или массив numpy) -> единицы прогресса симуляции (см fixed_point)
+        
+        if not self.fixed_point:
+            return build_points
+        if isinstance(build_points, np.ndarray):
+            return np.rint(build_points * FIXED_POINT_SCALE).astype(np.int64)
+        return round(build_points * FIXED_POINT_SCALE) # round() лишь убирает погрешность float - точное значение целое
+    
+    def from_progress_units(self, build_points):
+        # единицы прогресса симуляции -> очки строительства (для печати)
+        return {True: build_points / FIXED_POINT_SCALE, False: build_points}[self.fixed_point]
+    
+    def get_object_cost(self, obj_type):
+        # стоимость объекта в единицах прогресса симуляции
+        return self.to_progress_units(OBJ_COST[obj_type])
+
+    def get_progress_per_day_list(self, build_bonus, civ_for_lines):
+        # изменение прогресса за день по линиям self.progress (линии без фабрик в список не входят)
+        
+        # замечание: 
+        # список кэшируется в self.progress_per_day - его входные данные меняются только при событиях: 
+        # изменении закона, постройке объекта (в тч инфраструктуры) и перераспределении линий
+        # => кэш сбрасывается в run_sim() в дни событий (а также в reset() и load_state())
+
+        if self.progress_per_day is None:
+            self.progress_per_day = [self.get_progress_per_day(line_data, build_bonus, civ_num) 
+                                     for line_data, civ_num in zip(self.progress, civ_for_lines)]
+        return self.progress_per_day
+
+    def progress_lines(self, build_bonus, civ_for_lines, days=1):
+        # изменение прогресса линий self.progress за days дней
+        
+        # замечание: 
+        # float-прогресс - тот же, что и при сложении по дням, а не build_points + days * progress_per_day 
+        # (иначе результат может отличаться в последних знаках => и день постройки - от симуляции по дням), 
+        # но за число двоичных порядков прогресса, а не дней (см add_progress_days())
+
+        progress_per_day_list = self.get_progress_per_day_list(build_bonus, civ_for_lines)
+        
+        for line_data, progress_per_day in zip(self.progress, progress_per_day_list): # линии без фабрик не двигаются
+            
+            if self.fixed_point or days == 1: # целые => сложение по дням = умножение
+                line_data.build_points += days * progress_per_day
+            elif days <= PROGRESS_DAYS_DIRECT: # то же, что и add_progress_days(), но без вызова - шаги движка обычно короткие
+                build_points = line_data.build_points
+                for __ in range(days):
+                    build_points += progress_per_day
+                line_data.build_points = build_points
+            else:
+                line_data.build_points = add_progress_days(line_data.build_points, progress_per_day, days)
+
+    def get_days_to_complete(self, build_points, object_cost, progress_per_day):
+        # количество дней до ближайшего дня, когда check_all_objects_completed() увидит построенный объект на линии
+        # None - объект на линии не будет построен никогда
+        
+        if progress_per_day <= 0:
+            return None
+        
+        if self.fixed_point: # целые => точное деление
+            return max(1, -(-(object_cost - build_points) // progress_per_day))
+        
+        # замечание: ceil((object_cost - build_points) / progress_per_day) может ошибиться на 1 день - см progress_lines() 
+        # => оценка по порядкам прогресса с точной проверкой (см get_days_to_complete_float())
+        return get_days_to_complete_float(build_points, object_cost, progress_per_day, sys.maxsize)
+
+    def get_days_to_next_event(self, day, day_to_change_law, day_end, build_bonus, civ_for_lines):
+        # количество дней до ближайшего события: изменения закона, постройки объекта на одной из линий или date_end
+        # метод используется в движке по событиям (self.event_driven == True)
+        
+        days_to_event = [day_end - day]
+        
+        if day_to_change_law > day:
+            days_to_event.append(day_to_change_law - day)
+        
+        days_to_skip_limit = self.get_days_to_skip_limit()
+        if days_to_skip_limit is not None:
+            days_to_event.append(days_to_skip_limit)
+
+        progress_per_day_list = self.get_progress_per_day_list(build_bonus, civ_for_lines)
+        day_completed_min = None
+        
+        for line_data, progress_per_day in zip(self.progress, progress_per_day_list):
+            
+            # день постройки - из кэша линии, пока изменение прогресса за день то же (см ProgressLine)
+            completion = line_data.completion
+            if completion is None or completion[0] != progress_per_day:
+                days_to_complete = self.get_days_to_complete(line_data.build_points, self.get_object_cost(line_data.obj_type), progress_per_day)
+                completion = (progress_per_day, None if days_to_complete is None else day + days_to_complete)
+                line_data.completion = completion
+            
+            day_completed = completion[1]
+            if day_completed is not None and (day_completed_min is None or day_completed < day_completed_min):
+                day_completed_min = day_completed
+        
+        if day_completed_min is not None:
+            days_to_event.append(day_completed_min - day)
+        
+        for line_data in itertools.islice(self.progress, len(progress_per_day_list), None): # линии без фабрик => прогресс не меняется
+            if line_data.build_points >= self.get_object_cost(line_data.obj_type):
+                days_to_event.append(1)
+
+        return max(1, min(days_to_event))
+
     # -----------------------------------------------------
     # дополнительные методы:
     # -----------------------------------------------------
@@ -623,20 +1932,71 @@ class BuildSimulator():
             # имени ячейки из build_order должна соответствовать ячейка в self.cells_dict c таким же именем 
             
             # вариант ниже позволяет создавать ячейки корректно, выполняя при этом условие выше 
+            # (generic-ячейки - по get_cell(): в self.cells_dict их нет, пока они не отличаются от общей ячейки)
         
-        for idx, data in enumerate(deepcopy(build_order)): # deepcopy на всякий случай - тк в цикле можем менять build_order
+        for order_item in build_order: # копия build_order не нужна: в цикле меняются только имена generic-ячеек в элементах очереди
         
-            cell_name = data[0]
+            cell_name = order_item[0]
             
-            if cell_name not in self.cells_dict: # ?in CELLS_DICT - нет, 
-                                                 # тк мы можем строить повторно в ТОЙ ЖЕ ячейке => ее не нужно пересоздавать
-                new_cell = Cell(cell_name) # новые ячейки должны создаваться ТОЛЬКО здесь
+            if cell_name is None: # => generic-ячейка с новым именем => нужно обновить build_order
+                order_item[0] = Cell.GENERIC_NAME_BASE + str(self.generic_number)
+                self.add_generic_cell()
+                self.generic_number += 1
             
-                if cell_name is None: # => имя ячейки поменяется => нужно обновить build_order
-                    cell_name = new_cell.get_name()
-                    build_order[idx][0] = cell_name
-                
-                self.cells_dict[cell_name] = new_cell
+            elif self.get_cell(cell_name) is None: # ?in CELLS_DICT - нет, 
+                                                   # тк мы можем строить повторно в ТОЙ ЖЕ ячейке => ее не нужно пересоздавать
+                self.cells_dict[cell_name] = Cell(cell_name, self.infr_default) # новые ячейки должны создаваться ТОЛЬКО здесь
+    
+    # -----------------------------------------------------
+    # generic-ячейки (общие ячейки):
+    # -----------------------------------------------------
+    
+    # замечание: 
+    # generic-ячейки с одинаковыми параметрами (BuildSimMaxMilitary создает их без конца) отличаются только именем 
+    # => вместо ячейки на каждое имя - одна общая ячейка на отрезок номеров generic-ячеек с тем же self.infr_default; 
+    # собственная ячейка в self.cells_dict появляется, только если generic-ячейка начинает отличаться от общей (см get_own_cell())
+    
+    def add_generic_cell(self):
+        # общая ячейка для generic-ячейки с номером self.generic_number (новая - только при изменении self.infr_default)
+        
+        if self.generic_cells and self.generic_cells[-1][1].get_infrastructure() == self.infr_default:
+            return
+        
+        # замечание: номер 0 не используется generic-ячейками симуляции => имя общей ячейки ни с чем не совпадает
+        self.generic_cells.append((self.generic_number, Cell(None, self.infr_default, generic_number=0))) # проверка infr_default - здесь
+    
+    def get_cell(self, cell_name):
+        # ячейка по имени: из self.cells_dict или общая ячейка для generic-ячейки (None - такой ячейки нет)
+        
+        cell = self.cells_dict.get(cell_name)
+        if cell is not None or not isinstance(cell_name, str) or not cell_name.startswith(Cell.GENERIC_NAME_BASE):
+            return cell
+        
+        generic_number = cell_name[len(Cell.GENERIC_NAME_BASE):]
+        if not generic_number.isdigit() or int(generic_number) >= self.generic_number: # имя generic-ячейки, которой еще не было
+            return None
+        
+        generic_number = int(generic_number)
+        for first_generic_number, generic_cell in reversed(self.generic_cells): # отрезков номеров - единицы
+            if generic_number >= first_generic_number:
+                return generic_cell
+    
+    def get_own_cell(self, cell_name):
+        # ячейка по имени для изменения - копирование при изменении: 
+        # - общая ячейка копируется в self.cells_dict под именем generic-ячейки
+        # - ячейка, общая со снимком состояния, копируется при первом изменении после снимка (см save_state())
+        
+        cell = self.get_cell(cell_name)
+        is_shared = self.cells_copied is not None and cell_name not in self.cells_copied
+        
+        if cell_name not in self.cells_dict or is_shared:
+            cell = copy(cell)
+            cell.name = cell_name
+            self.cells_dict[cell_name] = cell
+            if self.cells_copied is not None:
+                self.cells_copied.add(cell_name)
+        
+        return cell
                 
     def check_build_order(self, build_order):
         # "fail_fast" метод: проверяет build_order на корректность
@@ -647,7 +2007,7 @@ class BuildSimulator():
         for line_data in build_order: 
 
             cell_name, obj_type, num_to_build = line_data
-            cell = self.cells_dict[cell_name] # краша быть не может
+            cell = self.get_cell(cell_name) # краша быть не может
             cell_infrastructure = cell.get_infrastructure()
             cell_obj_available = cell.get_obj_available()
             
@@ -689,6 +2049,18 @@ class BuildSimulator():
     # функции и методы печати:
     # -----------------------------------------------------
 
+    def print_sim(self, *args, **kwargs):
+        # печать симуляции - вместо print() в методах симуляции:
+        # - в тихом режиме (self.quiet == True) ничего не печатается
+        # - иначе печать идет в self.output_stream (None => sys.stdout)
+        
+        # замечание: 
+        # в отличие от disable_printout(), тихий режим и поток печати - свои у каждой симуляции
+        # => симуляции можно запускать одновременно в нескольких потоках
+        
+        if not self.quiet:
+            print(*args, file=self.output_stream, **kwargs)
+
     def print_header(self):
         # печать сообщения при начале симуляции (всегда)
 
@@ -702,7 +2074,7 @@ class BuildSimulator():
         header_str += '\n' + self.get_build_order_str().rstrip()
         header_str += '\n' + self.str_2
 
-        print(header_str)
+        self.print_sim(header_str)
 
     def print_aftermath(self, day):
         # печать сообщения при выходе из симуляции (всегда)
@@ -714,7 +2086,7 @@ class BuildSimulator():
         
         if self.printout: 
             # print('\n\n' + self.str_2)
-            print('\n' + self.str_2)
+            self.print_sim('\n' + self.str_2)
           
         aftermath_str = 'ГОТОВО! День = %i ' %day + '(%s-%s-%s)' %actual_date 
         aftermath_str += '\nЗАВЕРШЕНИИЕ СИМУЛЯЦИИ: %s' %quit_str
@@ -722,7 +2094,7 @@ class BuildSimulator():
         # aftermath_str += '\n' + self.str_1 + '\n'
         aftermath_str += '\n' + self.str_1 + '\n\n'
 
-        print(aftermath_str)
+        self.print_sim(aftermath_str)
         
     def get_progress_str(self, build_bonus=None, civ_for_lines=None):
         # составление строки, отражающей текущее состояние прогресса линий self.progress 
@@ -732,8 +2104,8 @@ class BuildSimulator():
         progress_str = 'Прогресс линий строительства:' + '\n' 
 
         for line_idx, line_data in enumerate(self.progress): 
-            cell_name, obj_type, num_to_build = line_data[0]
-            build_points = line_data[1]
+            cell_name, obj_type, num_to_build = line_data.cell_name, line_data.obj_type, line_data.num_to_build
+            build_points = self.from_progress_units(line_data.build_points)
             
             if num_to_build < 0:num_to_build = '∞'
             
@@ -743,11 +2115,10 @@ class BuildSimulator():
             add_str_1, add_str_2 = '', ''
             if build_bonus and civ_for_lines:
               
-                cell = self.cells_dict[cell_name]
+                cell = self.get_cell(cell_name)
                 cell_infrastructure = cell.get_infrastructure()
               
-                infr_bonus = {True:1, False:(10 + cell_infrastructure) / 10}[obj_type == 'infr']
-                progress_per_day = 5 * build_bonus[obj_type] * infr_bonus * civ_for_lines[line_idx] 
+                progress_per_day = self.from_progress_units(self.get_progress_per_day(line_data, build_bonus, civ_for_lines[line_idx]))
                 add_str_1 = ' (infr = %i)' %cell_infrastructure
                 add_str_2 = ', прогресс_в_день: %.2f (фабрики = %i)' %(progress_per_day, civ_for_lines[line_idx])
             
@@ -759,18 +2130,21 @@ class BuildSimulator():
         # составление строки, отражающей текущее состояние очереди строительства self.build_order
         # метод используется как вспомогательный для print_output() 
 
-        build_order_str = 'Очередь строительства:' + '\n' 
+        build_order_str_list = ['Очередь строительства:' + '\n'] # очередь может быть длинной => строки собираются ч/з join
 
         for line_data in self.build_order: 
             cell_name, obj_type, num_to_build = line_data
-            cell = self.cells_dict[cell_name]
+            cell = self.get_cell(cell_name)
             cell_infrastructure = cell.get_infrastructure()
             
             if num_to_build < 0:num_to_build = '∞'
             
-            build_order_str += "- ячейка: %s (infr = %i), заказанный_объект: '%s' (количество = %s)\n" %(cell_name, cell_infrastructure, obj_type, num_to_build) 
+            build_order_str_list.append("- ячейка: %s (infr = %i), заказанный_объект: '%s' (количество = %s)\n" %(cell_name, cell_infrastructure, obj_type, num_to_build))
+        
+        if self.build_order_source is not None: # элементы источника еще не взяты => печатаем его кратко
+            build_order_str_list.append(str(self.build_order_source))
 
-        return build_order_str
+        return ''.join(build_order_str_list)
 
     def print_output(self, optional_str, day, build_bonus, cons_goods_penalty, civ_for_lines, law_flag): # law_flag - день изменения закона или нет
         # печать сообщения в день события - при изменении закона или постройке объекта
@@ -795,11 +2169,25 @@ class BuildSimulator():
         output_str += self.str_2 + '\n'
         output_str += {True:'Прогресс линий строительства: EMPTY\n', False:self.get_progress_str(build_bonus, civ_for_lines)}[not self.progress]
         output_str += self.str_2 + '\n'
-        output_str += {True:'Очередь строительства: EMPTY\n', False:self.get_build_order_str()}[not self.build_order]
+        output_str += {True:'Очередь строительства: EMPTY\n', False:self.get_build_order_str()}[not self.build_order and self.build_order_source is None]
         output_str += self.str_2 + '\n'
         output_str += 'Построенные объекты: %s' %self.obj_built
 
-        print(output_str)
+        self.print_sim(output_str)
+
+    def get_day_end(self, date_end):
+        # день принудительного завершения симуляции по дате date_end - от начала симуляции (с проверкой date_end)
+        
+        date_end_exception = ValueError('Упс! {0} - некорректное значение для даты завершения симуляции!'.format(date_end)) 
+        
+        try:
+            day_end = get_days_diff(GAME_START, date_end)
+            if not isinstance(day_end, int) or day_end <= 0:
+                raise date_end_exception
+        except:
+            raise date_end_exception 
+        
+        return day_end
 
     # =====================================================
     # ОСНОВНОЙ МЕТОД - СИМУЛЯТОР СТРОИТЕЛЬСТВА:
@@ -817,17 +2205,10 @@ class BuildSimulator():
         # коррекция значений default-аргументов симуляции:
         # --------------------------------------------
         
-        if laws_timeline == 'no_changes': 
+        if isinstance(laws_timeline, str) and laws_timeline == 'no_changes': 
             laws_timeline = [] # ставить [] в default-значение 'опасно' (уууууу - вот насколько это опасно)
             
-        date_end_exception = ValueError('Упс! {0} - некорректное значение для даты завершения симуляции!'.format(date_end)) 
-        
-        try:
-            day_end = get_days_diff(GAME_START, date_end)
-            if not isinstance(day_end, int) or day_end <= 0:
-                raise date_end_exception
-        except:
-            raise date_end_exception 
+        day_end = self.get_day_end(date_end)
         
         # вариант (устарело - теперь новый формат date_end):
             # (см также check_default_args())
@@ -854,95 +2235,214 @@ class BuildSimulator():
         # предварительная работа с очередью строительства:
         # --------------------------------------------  
         
-        self.expand_cells_dict(build_order)
-        self.check_build_order(build_order)
+        # build_order - список (проверяется сразу весь) или ленивый источник (элементы проверяются по мере взятия, см pull_build_order())
+        
+        if isinstance(build_order, (list, tuple)):
+            build_order = deepcopy(build_order) # expand_cells_dict() меняет имена generic-ячеек => build_order пользователя не трогаем
+            self.expand_cells_dict(build_order)
+            self.check_build_order(build_order)
+        else:
+            if not isinstance(build_order, (BuildOrderRuns, BuildOrderSource)):
+                build_order = BuildOrderSource(build_order)
+            self.build_order_source = deepcopy(build_order) # источник пользователя не трогаем
+            build_order = []
 
         # --------------------------------------------
         # доопределение набора стартовых значений параметров симуляции:
         # --------------------------------------------    
         
-        country_condition = (self.country != COUNTRY_DEFAULT)
-        
-        if country_condition:
-            laws_start = CONDITIONS_START[self.country]['laws_start'] # краша быть не может
-            self.laws_timeline += laws_start
-            # self.laws_timeline += deepcopy(laws_start) # deepcopy не нужно
-        
-        self.build_order += deepcopy(build_order) # актуальное состояние очереди строительства
+        self.build_order += build_order # актуальное состояние очереди строительства
         # --------------------------------------------
         # блок *16346 (см main.py): 
         # тест не использования deepcopy для self.build_order       
         # self.build_order += build_order # => краш при 2й симуляции по той же очереди строительства
         # --------------------------------------------
         
-        self.laws_timeline += laws_timeline
-        # self.laws_timeline += deepcopy(laws_timeline) # deepcopy не нужно 
-        # print("\nCHECK\n", self.laws_timeline)
+        self.law_schedule = self.get_law_schedule(laws_timeline) # стартовые законы страны + laws_timeline
+        self.law_segment_idx = 0
+        
+        self.day_to_change_law = self.get_day_to_change_law() # ближайший день изменения закона
+        # print(self.day_to_change_law)
+        if self.day_to_change_law != 1:
+            raise ValueError('Упс! Стартовые законы не определены!')
+        
         # --------------------------------------------
-        # блок *78345 (см main.py): 
-        # тест изменения внутренней стр-ры laws_timeline при изменении self.laws_timeline
-        # self.laws_timeline[-1][-1] = 'Ненарушаемая_изоляция' 
+        # состояние основного цикла:
+        # (хранится в полях экземпляра класса - чтобы симуляцию можно было продолжить с сохраненного дня, см save_state())
         # --------------------------------------------
         
-        day_to_change_law = self.get_day_to_change_law() # ближайший день изменения закона
-        # print(day_to_change_law)
-        if day_to_change_law != 1:
-            raise ValueError('Упс! Стартовые законы не определены!')
-            
-        build_log = [] # лог построенных объектов: (день постройки, тип постройки) - используется для графиков
+        self.day = 1 # текущий день симуляции
+        self.day_end = day_end # день принудительного завершения симуляции
+        self.civ_trade_av = civ_trade_av 
+        
+        self.cons_goods_penalty = None # определяются в 1й день - при установке стартовых законов
+        self.civ_for_lines = None 
+        self.build_bonus = None 
+        
+        self.build_log = [] # лог построенных объектов: (день постройки, тип постройки) - используется для графиков
 
         self.print_header() # переместили вниз, тк используем self.build_order
         
-        # --------------------------------------------
-        # непосредственно симуляция строительства:
-        # --------------------------------------------        
+        if self.get_result_cache() is not None or self.get_result_store() is not None:
+            self.scenario = self.get_scenario()
+        
+        law_run_key = None
+        if self.law_checkpoints:
+            law_run_key = self.get_law_run_key()
+        
+        return self.run_cached_sim(law_run_key)
+
+    def build_sim_iter(self, *args, **kwargs):
+        # потоковая версия build_sim() (аргументы - те же, в тч в классах-наследниках): 
+        # генератор событий симуляции - LawEvent, BuildEvent и в конце EndEvent
+        
+        # замечание: 
+        # симуляция идет по мере взятия событий; build_log не копится, кэш и хранилище результатов не используются
+        # => при досрочной остановке состояние симуляции - на дне последнего взятого события
+        
+        stream_events = self.stream_events
+        self.stream_events = True
+        try:
+            return self.build_sim(*args, **kwargs)
+        finally:
+            self.stream_events = stream_events
+
+    def run_sim(self):
+        # непосредственно симуляция строительства - основной цикл (см run_sim_iter())
+        
+        for __ in self.run_sim_iter():
+            pass
+        return self.build_log 
+
+    # -----------------------------------------------------
+    # контрольные точки по законам (см law_checkpoints):
+    # -----------------------------------------------------
+    
+    # замечание: 
+    # состояние в начале дня k-го изменения законов зависит только от первых k отрезков расписания (и от всего остального, кроме законов) 
+    # => снимок этого дня подходит для нового расписания, если первые k отрезков у него те же, а k-й отрезок начинается не раньше
+    
+    def get_law_run_key(self):
+        # ключ симуляции без расписания законов: сценарий (см get_scenario()) без законов 
+        # None - контрольные точки не используются: 
+        # подробная печать (событий до контрольной точки не будет) или ленивый источник (элементы заранее неизвестны)
+        
+        if self.printout:
+            return None
+        if self.build_order_source is not None and self.build_order_source.get_key() is None:
+            return None
+        
+        scenario = self.scenario or self.get_scenario()
+        return freeze_value({key: value for key, value in scenario.items() if key not in ('laws_timeline', 'LAWS_MODIFICATORS')})
+    
+    def get_law_checkpoints(self, law_run_key):
+        # контрольные точки последней симуляции, подходящие для текущей (law_run_key и self.law_schedule): [(номер отрезка, снимок), ...]
+        
+        if self.law_checkpoints_last is None or self.law_checkpoints_last[0] != law_run_key:
+            return []
+        
+        __, law_schedule_last, law_checkpoints_last = self.law_checkpoints_last
+        law_checkpoints = []
+        
+        for law_segment_idx, state in law_checkpoints_last: # по возрастанию дня => первая неподходящая точка - и дальше не подойдут
+            
+            day_to_change_law = self.law_schedule.get_day(law_segment_idx)
+            if law_schedule_last.segments[:law_segment_idx] != self.law_schedule.segments[:law_segment_idx]:
+                break
+            if day_to_change_law != -1 and day_to_change_law < state['day']:
+                break
+            
+            law_checkpoints.append((law_segment_idx, state))
+        
+        return law_checkpoints
+    
+    def run_sim_from_law_checkpoint(self, law_run_key=None):
+        # run_sim() с 1го дня (после build_sim()) - с последней подходящей контрольной точки последней симуляции 
+        # (законы, построенные объекты, лог и тд - из снимка; расписание законов - текущее)
+        # контрольные точки этой симуляции запоминаются вместо прежних (law_run_key is None - без контрольных точек)
+        
+        if law_run_key is None:
+            return self.run_sim()
         
-        for day in itertools.count(1):
+        law_schedule = self.law_schedule
+        law_checkpoints = self.get_law_checkpoints(law_run_key)
+        
+        if law_checkpoints: 
+            __, state = law_checkpoints.pop() # в день продолжения контрольная точка будет записана заново
+            self.load_state(state)
+            self.law_schedule = law_schedule
+            self.day_to_change_law = self.get_day_to_change_law()
+        
+        self.law_checkpoints_last = (law_run_key, law_schedule, law_checkpoints)
+        self.law_checkpoints_taken = law_checkpoints
+        try:
+            return self.run_sim()
+        finally:
+            self.law_checkpoints_taken = None
+    
+    def run_sim_iter(self, keep_log=True):
+        # основной цикл - генератор событий симуляции (см build_sim_iter())
+        # цикл начинается с дня self.day и использует текущее состояние полей экземпляра класса
+        # (т.е. его можно запустить как после build_sim(), так и после load_state())
+        # keep_log - вести ли self.build_log (в потоковом режиме не нужен)
+
+        event_driven = self.is_event_driven()
+
+        while True:
+            
+            if self.law_checkpoints_taken is not None and self.day == self.day_to_change_law and self.law_segment_idx > 0: # в 1й день - старт симуляции
+                self.law_checkpoints_taken.append((self.law_segment_idx, self.save_state()))
+            
+            self.day_start_optional_stuff()
 
             # --------------------------------------------
             # чек изменения закона:
             # --------------------------------------------
 
-            if day == day_to_change_law:
+            if self.day == self.day_to_change_law:
               
-                # print("HERE")
-
-                is_cons_goods_was_changed, optional_str = self.change_laws_current()      
-                if is_cons_goods_was_changed: # закон на ТНП был изменен
+                self.progress_per_day = None # бонусы строительства (и, возможно, линии) меняются => кэш сбрасывается
+                
+                law_segment = self.change_laws_current()      
+                if law_segment.cons_goods_changed: # закон на ТНП был изменен
 
-                    cons_goods_penalty = self.get_cons_goods_penalty()
-                    civ_for_lines = self.progress_change_lines_num(cons_goods_penalty, civ_trade_av)
+                    self.cons_goods_penalty = law_segment.cons_goods_penalty
+                    self.civ_for_lines = self.progress_change_lines_num(self.cons_goods_penalty, self.civ_trade_av)
 
-                build_bonus = self.get_build_bonus()
-                day_to_change_law = self.get_day_to_change_law() 
+                self.build_bonus = self.get_build_bonus(law_segment)
+                self.day_to_change_law = self.get_day_to_change_law() 
 
                 # --------------------------------------------
                 if self.printout:
-                    self.print_output(optional_str, day, build_bonus, cons_goods_penalty, civ_for_lines, law_flag=True)
+                    self.print_output(law_segment.laws_str, self.day, self.build_bonus, self.cons_goods_penalty, self.civ_for_lines, law_flag=True)
                 # --------------------------------------------
-
-                # if country_condition:
-                #     print('\n', CONDITIONS_START[self.country]['laws_start'])
-                # print('\n', laws_timeline)
-                # print('\n', self.laws_timeline)
+                
+                yield LawEvent(self.day, law_segment.laws_str, dict(self.build_bonus), self.cons_goods_penalty)
                 
             # --------------------------------------------
             # чек постройки объектов:
             # --------------------------------------------
 
             is_not_infr_completed, optional_str, build_log_today = self.check_all_objects_completed()
+            
+            if build_log_today: # линии (и инфраструктура ячеек) изменились => кэш прогресса линий сбрасывается
+                self.progress_per_day = None
 
             if is_not_infr_completed:
-                civ_for_lines = self.progress_change_lines_num(cons_goods_penalty, civ_trade_av)
+                self.civ_for_lines = self.progress_change_lines_num(self.cons_goods_penalty, self.civ_trade_av)
 
-            for obj_type in build_log_today:
-                build_log.append((day, obj_type))
+            if keep_log:
+                for obj_type in build_log_today:
+                    self.build_log.append((self.day, obj_type))
 
             # --------------------------------------------
             if build_log_today: 
                 if self.printout:
-                    self.print_output(optional_str, day, build_bonus, cons_goods_penalty, civ_for_lines, law_flag=False)
+                    self.print_output(optional_str, self.day, self.build_bonus, self.cons_goods_penalty, self.civ_for_lines, law_flag=False)
             # --------------------------------------------
+            
+            for obj_type in build_log_today:
+                yield BuildEvent(self.day, obj_type)
 
             # --------------------------------------------
             # опциональная часть и выход из цикла:
@@ -951,8 +2451,8 @@ class BuildSimulator():
             self.everyday_optional_stuff()
             quit_trigger, __ = self.quit_trigger()
         
-            if quit_trigger or day == day_end: # у триггера приоритет над выходом по дате
-                self.print_aftermath(day)
+            if quit_trigger or self.day == self.day_end: # у триггера приоритет над выходом по дате
+                self.print_aftermath(self.day)
                 break
               
             # замечание: условие day == day_end можно рассматривать как 'quit_trigger по умолчанию':
@@ -962,21 +2462,19 @@ class BuildSimulator():
             # --------------------------------------------
             # изменение прогресса ячеек:
             # --------------------------------------------
+            
+            days_to_skip = 1
+            if event_driven: # между событиями ничего не происходит => сразу переходим к ближайшему событию
+                days_to_skip = self.get_days_to_next_event(self.day, self.day_to_change_law, self.day_end, self.build_bonus, self.civ_for_lines)
 
-            progress_len = len(self.progress)
-            for line_idx, civ_num in enumerate(civ_for_lines):
-                if line_idx < progress_len: 
-                  
-                    cell_name, obj_type, __ = self.progress[line_idx][0]
-                    cell = self.cells_dict[cell_name]
-                    cell_infrastructure = cell.get_infrastructure()
-    
-                    infr_bonus = {True:1, False:(10 + cell_infrastructure) / 10}[obj_type == 'infr']
-                    progress_per_day = 5 * build_bonus[obj_type] * infr_bonus * civ_num                               
-                    self.progress[line_idx][1] += progress_per_day 
+            self.progress_lines(self.build_bonus, self.civ_for_lines, days_to_skip)
+            self.skipped_days_optional_stuff(days_to_skip - 1)
+            self.day += days_to_skip
 
-        build_log.append((day, 'end')) # может понадобиться для некоторых графиков 
-        return build_log 
+        if keep_log:
+            self.build_log.append((self.day, 'end')) # может понадобиться для некоторых графиков 
+        
+        yield EndEvent(self.day, deepcopy(self.obj_built))
 
 # =====================================================
 # класс BuildSimMaxMilitary - симулятор строительства: 
@@ -1026,8 +2524,25 @@ class BuildSimulator():
 
 class BuildSimMaxMilitary(BuildSimulator):
 
+    # переключатель поиска развилки (см find_mil_extremum()): 
+    # True - в симуляции запоминается состояние в начале дня, когда из очереди уходит последняя фабрика
+    fork_search = False
+
+    def reset(self):
+        super().reset()
+        self.day_start_state = None # снимок состояния в начале текущего дня (только при fork_search == True)
+        self.fork_state = None # снимок состояния в начале дня развилки (только при fork_search == True)
+
     def reset_obj_built(self):
         self.obj_built = {'civ':0, 'mil':0} # в данной симуляции не строим инфраструктуру
+    
+    def get_scenario(self):
+        # очередь строительства в данной симуляции однозначно задается количеством фабрик для постройки
+        # => такой же сценарий можно получить и для продолжения с развилки (см build_sim_from_fork())
+        
+        scenario = super().get_scenario()
+        scenario['build_order'] = self.civ_num_to_build
+        return scenario
 
     # -----------------------------------------------------
     # новый header - в соответствии с параметрами симуляции:
@@ -1050,7 +2565,7 @@ class BuildSimMaxMilitary(BuildSimulator):
         header_str += '\nДата завершения симуляции: (%i-%i-%i)' %date_end
         header_str += '\n' + self.str_2
 
-        print(header_str)
+        self.print_sim(header_str)
 
     # -----------------------------------------------------
     # новый порядок добавления линий - в соответствии со схемой строительства:
@@ -1067,8 +2582,68 @@ class BuildSimMaxMilitary(BuildSimulator):
                 # self.cells_dict[cell_name] = new_cell
                 # self.build_order.append([cell_name, 'mil', 1])
             
+            if self.pull_build_order(): # в источнике еще есть фабрики
+                return
+            
+            if self.fork_search and self.fork_state is None: # развилка: с civ_num_to_build + 1 здесь ушла бы еще одна фабрика
+                self.fork_state = self.day_start_state
+            
             self.build_order.append([None, 'mil', 1])
-            self.expand_cells_dict(self.build_order)
+            self.expand_cells_dict([self.build_order[-1]]) # новая ячейка нужна только для добавленного воензавода
+
+    # -----------------------------------------------------
+    # развилка симуляций с civ_num_to_build и civ_num_to_build + 1:
+    # -----------------------------------------------------
+    
+    # замечание: 
+    # симуляции с civ_num_to_build и civ_num_to_build + 1 совпадают до дня, когда из очереди уходит последняя фабрика:
+    # с civ_num_to_build дальше начинаются воензаводы, а с civ_num_to_build + 1 - еще одна фабрика;
+    # при этом в начале этого дня состояния симуляций отличаются только еще одной фабрикой в конце очереди
+    # => симуляцию с civ_num_to_build + 1 можно продолжить с этого дня, а не начинать с 1го дня
+
+    def day_start_optional_stuff(self):
+        # запоминаем состояние в начале дня, если в этот день из очереди может уйти последняя фабрика
+        
+        if not self.fork_search or self.fork_state is not None:
+            return
+        
+        if self.day == self.day_to_change_law: # изменение закона на ТНП может добавить сразу несколько линий
+            self.day_start_state = self.save_state()
+            return 
+        
+        # иначе из очереди уходит не больше 2х объектов на каждый построенный: 
+        # новая линия вместо завершенной + новая линия от построенной фабрики
+        lines_completed = sum(line_data.build_points >= self.get_object_cost(line_data.obj_type) for line_data in self.progress)
+        if lines_completed and self.get_build_order_len() <= 2 * lines_completed:
+            self.day_start_state = self.save_state()
+
+    def build_sim_from_fork(self, civ_num_to_build, infr_av, date_end=INFINITE_LOOP_BREAKER): 
+        # симуляция с civ_num_to_build фабриками - продолжение с развилки self.fork_state, 
+        # найденной в предыдущей симуляции с civ_num_to_build - 1 фабриками (при fork_search == True)
+        # замечание: подробная печать событий до дня развилки не повторяется
+        
+        if self.fork_state is None: # развилки не было => продолжать не с чего
+            raise ValueError('Упс! Нет развилки для продолжения симуляции!')
+        
+        self.print_new_header(civ_num_to_build, infr_av, date_end)
+        
+        self.infr_default = infr_av
+        
+        self.load_state(self.fork_state)
+        self.day_start_state, self.fork_state = None, None
+        
+        if self.build_order_source is not None: # фабрика - в конец очереди, после фабрик источника
+            self.build_order_source.extend(None, 'civ')
+        else:
+            self.build_order.append([None, 'civ', 1])
+            self.expand_cells_dict([self.build_order[-1]])
+        
+        # сценарий - как у build_sim() с civ_num_to_build фабриками 
+        # замечание: если результат найден в кэше, развилки для следующей симуляции не будет => она начнется с 1го дня
+        if self.scenario is not None: 
+            self.scenario = dict(self.scenario, build_order=civ_num_to_build, infr_default=infr_av)
+        
+        return self.run_cached_sim()
             
     # -----------------------------------------------------
     # новый build_sim:
@@ -1078,7 +2653,7 @@ class BuildSimMaxMilitary(BuildSimulator):
         # в данной симуляции выход из цикла должен быть всегда по date_end
         self.print_new_header(civ_num_to_build, infr_av, date_end)
         
-        Cell.INFRASTR_DEFAULT = infr_av
+        self.infr_default = infr_av
         
         # варианты:
         
@@ -1094,26 +2669,190 @@ class BuildSimMaxMilitary(BuildSimulator):
             # 2)
             # build_order = [[Cell().get_name(), 'civ', 1] for __ in range(civ_num_to_build)] # не работает, тк name = 'generic_...'
         
-        build_order = [[None, 'civ', 1] for __ in range(civ_num_to_build)]
-        return super().build_sim(build_order, laws_timeline, civ_trade_av, date_end)
+        self.civ_num_to_build = civ_num_to_build # для сценария симуляции (см get_scenario())
         
+        build_order = BuildOrderRuns([(None, 'civ', max(civ_num_to_build, 0))]) # элементы очереди берутся по мере надобности
+        return super().build_sim(build_order, laws_timeline, civ_trade_av, date_end)
+    
     # -----------------------------------------------------
-    # методы визуализации:
+    # пакетная симуляция (numpy):
     # -----------------------------------------------------
     
-    def visualize_efficiency(self, civ_num_to_build_list, infr_av, laws_timeline, civ_trade_av, date_end):
-        # ?какой график ты строишь - определись
-        for civ_num_to_build in civ_num_to_build_list:
-
-            build_log = self.build_sim(civ_num_to_build, infr_av, laws_timeline, civ_trade_av, date_end)
-            
-            mil_built_day = [day for day, obj in build_log if obj == 'mil']
-            mil_built_total = len(mil_built_day)
-            mil_built_num = list(range(1, mil_built_total + 1)) 
-            
-            # варианты:
-                # https://stackoverflow.com/questions/9304408/how-to-add-an-integer-to-each-element-in-a-list
-                # new_list = [x+1 for x in my_list]
+    # замечание: 
+    # в данной симуляции очередь строительства - civ_num_to_build фабрик, затем воензаводы без конца, 
+    # а линии берутся из начала очереди и возвращаются в ее начало 
+    # => на линиях фабрики всегда идут раньше воензаводов, и пока в очереди есть фабрики - воензаводов на линиях нет
+    # => состояние сценария: прогресс и тип (фабрика/воензавод) каждой линии + количество фабрик в очереди
+    # (+ флаг пустой очереди: при civ_num_to_build <= 0 первый вызов progress_add_new_line() только добавляет воензавод в очередь)
+    
+    def build_sim_batch(self, sim_args_list, country_start_list=None):
+        # пакетная версия build_sim() - все сценарии симулируются одновременно (см get_batch_scenarios())
+        # sim_args - аргументы build_sim(): (civ_num_to_build, infr_av, laws_timeline, civ_trade_av, date_end)
+        # возвращает список (build_log, obj_built) в порядке sim_args_list - как map_build_sim()
+        
+        scenarios = self.get_batch_scenarios(sim_args_list, ('no_changes', 0, INFINITE_LOOP_BREAKER), country_start_list)
+        sim_num = len(scenarios)
+        
+        for sim_args, __, __ in scenarios:
+            infr_av = sim_args[1]
+            if not isinstance(infr_av, int) or infr_av not in range(11):
+                raise ValueError("%s - некорректное значение для инфраструктуры ячейки!" %infr_av)
+        
+        # --------------------------------------------
+        # параметры сценариев:
+        # --------------------------------------------
+        
+        civ_in_order = np.array([max(sim_args[0], 0) for sim_args, __, __ in scenarios], dtype=np.int64) # фабрики в очереди (не на линиях)
+        infr_bonus = np.array([(10 + sim_args[1]) / 10 for sim_args, __, __ in scenarios]) # как в get_progress_per_day()
+        civ_trade_av = np.array([sim_args[3] for sim_args, __, __ in scenarios], dtype=np.int64)
+        day_end = np.array([self.get_day_end(sim_args[4]) for sim_args, __, __ in scenarios], dtype=np.int64)
+        
+        civ_start = np.array([sim.obj_start['civ'] for __, sim, __ in scenarios], dtype=np.int64)
+        mil_start = np.array([sim.obj_start['mil'] for __, sim, __ in scenarios], dtype=np.int64)
+        
+        law_events = self.get_batch_law_events([law_schedule for __, __, law_schedule in scenarios])
+        
+        # --------------------------------------------
+        # состояние сценариев:
+        # --------------------------------------------
+        
+        lines_max = int(max(np.max((civ_start + civ_in_order + civ_trade_av) // 15, initial=0), 0)) + 2 # линий не больше, чем фабрик / 15 (+ остаток)
+        line_idx = np.arange(lines_max)
+        
+        build_points = np.zeros((sim_num, lines_max), dtype={True: np.int64, False: float}[self.fixed_point]) # прогресс линий
+        is_mil = np.zeros((sim_num, lines_max), dtype=bool) # тип объекта на линии: воензавод/фабрика
+        civ_for_lines = np.zeros((sim_num, lines_max)) # фабрики по линиям
+        lines_num = np.zeros(sim_num, dtype=np.int64) # количество линий
+        is_order_empty = civ_in_order == 0 # очередь пуста (воензаводы в нее еще не добавлялись)
+        
+        civ_built = np.zeros(sim_num, dtype=np.int64)
+        mil_built = np.zeros(sim_num, dtype=np.int64)
+        cons_goods_penalty = np.zeros(sim_num)
+        build_bonus_civ = np.zeros(sim_num)
+        build_bonus_mil = np.zeros(sim_num)
+        
+        is_running = np.ones(sim_num, dtype=bool)
+        build_log_list = [[] for __ in range(sim_num)]
+        obj_built_list = [None] * sim_num
+        
+        def change_lines_num(rows):
+            # progress_change_lines_num() для сценариев rows
+            
+            civ_total_num = civ_start[rows] + civ_built[rows] + civ_trade_av[rows]
+            all_total_num = civ_total_num + mil_start[rows] + mil_built[rows]
+            civ_available = civ_total_num - np.ceil(all_total_num * cons_goods_penalty[rows]).astype(np.int64)
+            
+            lines_full = np.maximum(civ_available // 15, 0) # как range(civ_available // 15) в get_civ_for_lines()
+            civ_rest = civ_available % 15
+            lines_for_civ = lines_full + (civ_rest > 0)
+            
+            civ_for_lines[rows] = np.where(line_idx < lines_full[:, None], 15, np.where(line_idx < lines_for_civ[:, None], civ_rest[:, None], 0))
+            
+            lines_old = lines_num[rows]
+            lines_lost = is_order_empty[rows] & (lines_for_civ > lines_old) # первая новая линия не добавляется (см замечание)
+            is_order_empty[rows] &= ~lines_lost
+            lines_new = np.where(lines_lost, lines_for_civ - 1, lines_for_civ)
+            
+            lines_returned = (line_idx >= lines_new[:, None]) & (line_idx < lines_old[:, None]) # => в начало очереди
+            civ_in_order[rows] += (lines_returned & ~is_mil[rows]).sum(axis=1)
+            
+            lines_added = (line_idx >= lines_old[:, None]) & (line_idx < lines_new[:, None]) # <= из начала очереди
+            is_mil[rows] = np.where(lines_added, (line_idx - lines_old[:, None]) >= civ_in_order[rows][:, None], is_mil[rows])
+            build_points[rows] = np.where(lines_added, 0, build_points[rows])
+            civ_in_order[rows] -= np.minimum(np.maximum(lines_new - lines_old, 0), civ_in_order[rows])
+            
+            lines_num[rows] = lines_new
+        
+        # --------------------------------------------
+        # основной цикл - общий для всех сценариев:
+        # --------------------------------------------
+        
+        for day in range(1, int(np.max(day_end, initial=0)) + 1):
+            
+            # изменение законов:
+            for rows, law_segment in law_events.get(day, []):
+                
+                if law_segment.cons_goods_changed:
+                    cons_goods_penalty[rows] = law_segment.cons_goods_penalty
+                    change_lines_num(rows)
+                
+                build_bonus = dict(law_segment.build_bonus)
+                build_bonus_civ[rows] = build_bonus['civ']
+                build_bonus_mil[rows] = build_bonus['mil']
+            
+            # постройка объектов:
+            object_cost = np.where(is_mil, self.get_object_cost('mil'), self.get_object_cost('civ'))
+            completed = (build_points >= object_cost) & (line_idx < lines_num[:, None])
+            rows = np.nonzero(completed.any(axis=1))[0]
+            
+            if rows.size:
+                
+                civ_completed = (completed[rows] & ~is_mil[rows]).sum(axis=1)
+                mil_completed = (completed[rows] & is_mil[rows]).sum(axis=1)
+                
+                for row, civ_num, mil_num in zip(rows, civ_completed, mil_completed):
+                    if is_running[row]: # фабрики на линиях идут раньше воензаводов => порядок лога - как в build_sim()
+                        build_log_list[row] += [(day, 'civ')] * int(civ_num) + [(day, 'mil')] * int(mil_num)
+                
+                civ_built[rows] += civ_completed
+                mil_built[rows] += mil_completed
+                
+                # завершенные линии удаляются (остальные сдвигаются, сохраняя порядок), новые - из начала очереди в конец линий
+                lines_order = np.argsort(completed[rows], axis=1, kind='stable')
+                build_points[rows] = np.take_along_axis(build_points[rows], lines_order, axis=1)
+                is_mil[rows] = np.take_along_axis(is_mil[rows], lines_order, axis=1)
+                
+                lines_kept = lines_num[rows] - (civ_completed + mil_completed)
+                lines_added = (line_idx >= lines_kept[:, None]) & (line_idx < lines_num[rows][:, None])
+                is_mil[rows] = np.where(lines_added, (line_idx - lines_kept[:, None]) >= civ_in_order[rows][:, None], is_mil[rows])
+                build_points[rows] = np.where(lines_added, 0, build_points[rows])
+                civ_in_order[rows] -= np.minimum(civ_completed + mil_completed, civ_in_order[rows])
+                
+                change_lines_num(rows)
+            
+            # завершение сценариев (quit_trigger() - только пока в очередь не добавлялись воензаводы):
+            for row in np.nonzero(is_running & ((is_order_empty & (lines_num == 0)) | (day_end == day)))[0]:
+                is_running[row] = False
+                build_log_list[row].append((day, 'end'))
+                obj_built_list[row] = {'civ':int(civ_built[row]), 'mil':int(mil_built[row])}
+            
+            if not is_running.any():
+                break
+            
+            # изменение прогресса линий:
+            build_bonus = np.where(is_mil, build_bonus_mil[:, None], build_bonus_civ[:, None])
+            build_points += self.to_progress_units(5 * build_bonus * infr_bonus[:, None] * civ_for_lines) # как в get_progress_per_day(); линии без фабрик не двигаются
+        
+        self.print_sim('ПАКЕТНАЯ СИМУЛЯЦИЯ: %i сценариев (максимизация военных заводов)' %sim_num)
+        return list(zip(build_log_list, obj_built_list))
+        
+    # -----------------------------------------------------
+    # методы визуализации:
+    # -----------------------------------------------------
+    
+    def visualize_efficiency(self, civ_num_to_build_list, infr_av, laws_timeline, civ_trade_av, date_end, workers=None):
+        # ?какой график ты строишь - определись
+        # workers - количество процессов для параллельных симуляций (None - последовательно, см map_build_sim())
+        
+        laws_timeline = self.get_law_schedule(laws_timeline) # одно расписание законов на все симуляции
+        sim_args_list = [(civ_num_to_build, infr_av, laws_timeline, civ_trade_av, date_end) for civ_num_to_build in civ_num_to_build_list]
+        
+        if workers is None and not self.printout: # все симуляции - одним пакетом (подробная печать - только в build_sim())
+            build_log_list = [build_log for build_log, __ in self.build_sim_batch(sim_args_list)]
+        else:
+            with get_executor(workers, self.pool_threads) as executor:
+                build_log_list = [build_log for build_log, __ in self.map_build_sim(sim_args_list, executor)]
+        
+        for civ_num_to_build, build_log in zip(civ_num_to_build_list, build_log_list):
+            
+            build_log = BuildLog.from_log(build_log)
+            mil_built_day = build_log.get_days('mil')
+            mil_built_total = len(mil_built_day)
+            mil_built_num = list(range(1, mil_built_total + 1)) 
+            
+            # варианты:
+                # https://stackoverflow.com/questions/9304408/how-to-add-an-integer-to-each-element-in-a-list
+                # new_list = [x+1 for x in my_list]
                 # map(lambda x:x+1, [1,2,3])
     
             # график с 1го дня: (можно лучше)
@@ -1135,31 +2874,42 @@ class BuildSimMaxMilitary(BuildSimulator):
         plt.savefig('graph.png')
         # plt.show() # для версии на ПК
 
-    def find_mil_extremum(self, infr_av, laws_timeline, civ_trade_av, date_end, mil_built_stop=10):
-    
+    def find_mil_extremum(self, infr_av, laws_timeline, civ_trade_av, date_end, mil_built_stop=10, search='linear', workers=None, checkpoint_path=None):
+        # поиск количества фабрик для постройки, при котором к date_end построено максимальное количество воензаводов
+        # search - режим поиска:
+            # - 'linear' - перебор civ_num_to_build = 1, 2, 3, ... пока воензаводов не меньше mil_built_stop
+            # - 'golden' - поиск золотым сечением (предполагается, что зависимость ~унимодальная), см find_mil_extremum_golden()
+        # workers - количество процессов для параллельных симуляций (None - последовательно, см map_build_sim())
+        # date_end - дата или список дат: для списка - оптимум на каждую дату по одному перебору (см find_mil_extremum_dates())
+        # checkpoint_path - файл прогресса перебора (None - без него): прерванный перебор продолжается с места остановки (см SweepCheckpoint)
+        
+        laws_timeline = self.get_law_schedule(laws_timeline) # одно расписание законов на все симуляции перебора
+        
+        if isinstance(date_end, list):
+            return self.find_mil_extremum_dates(infr_av, laws_timeline, civ_trade_av, date_end, mil_built_stop, workers, checkpoint_path=checkpoint_path)
+        
+        if search == 'linear':
+            mil_built_dict, sim_num = self.find_mil_extremum_linear(infr_av, laws_timeline, civ_trade_av, date_end, mil_built_stop, workers, checkpoint_path)
+        elif search == 'golden':
+            mil_built_dict, sim_num = self.find_mil_extremum_golden(infr_av, laws_timeline, civ_trade_av, date_end, mil_built_stop, workers, checkpoint_path=checkpoint_path)
+        else:
+            raise ValueError("%s - некорректное значение для режима поиска!" %search)
+        
         mil_built_max, mil_built_1st_day, civ_num_to_build_optimum = 0, 0, 0
         x_coord, y_coord = [], []
         
-        for civ_num_to_build in itertools.count(1): 
-
-            build_log = self.build_sim(civ_num_to_build, infr_av, laws_timeline, civ_trade_av, date_end)
+        for civ_num_to_build, (mil_built_total, mil_built_day_1st) in sorted(mil_built_dict.items()):
             
-            mil_built_day = [day for day, obj in build_log if obj == 'mil']
-            mil_built_total = len(mil_built_day)
-            # mil_built_num = list(range(1, len(mil_built_day) + 1)) 
-
-            if mil_built_total < mil_built_stop: # не делаем лишнюю работу, когда результат и так уже понятен
-                break
-
             x_coord.append(civ_num_to_build)
             y_coord.append(mil_built_total)
 
             if mil_built_total >= mil_built_max: # при >= найдет последнее - те, макс число фабрик при макс числе воензав
-                mil_built_max, mil_built_1st_day, civ_num_to_build_optimum = mil_built_total, mil_built_day[0], civ_num_to_build
-
+                mil_built_max, mil_built_1st_day, civ_num_to_build_optimum = mil_built_total, mil_built_day_1st, civ_num_to_build
+        
         mil_built_1st_date = add_days(GAME_START, mil_built_1st_day)
 
-        print('Optimum: %i civilian_f built => %i military_f built\nDate of the 1st military_f built: %s\n' %(civ_num_to_build_optimum, mil_built_max, mil_built_1st_date))
+        print('Optimum: %i civilian_f built => %i military_f built\nDate of the 1st military_f built: %s' %(civ_num_to_build_optimum, mil_built_max, mil_built_1st_date))
+        print('Simulations run: %i (search: %s)\n' %(sim_num, search))
         
         # fig = plt.gcf() # для версии на ПК
         # fig.canvas.set_window_title(self.country) # для версии на ПК 
@@ -1172,7 +2922,217 @@ class BuildSimMaxMilitary(BuildSimulator):
 
         plt.savefig('graph.png')
         # plt.show() # для версии на ПК
+    
+    def get_mil_built(self, build_log): 
+        # количество построенных воензаводов и день постройки 1го из них (0 - если не построено ни одного)
+        # build_log - лог build_sim() (в тч BuildLog) или события build_sim_iter()
         
+        build_log = BuildLog.from_log(build_log)
+        return int(build_log.get_count('mil')), (build_log.get_first_day('mil') or 0)
+
+    def find_mil_extremum_linear(self, infr_av, laws_timeline, civ_trade_av, date_end, mil_built_stop, workers=None, checkpoint_path=None):
+        # перебор civ_num_to_build = 1, 2, 3, ... для find_mil_extremum()
+        # возвращает словарь civ_num_to_build:(количество воензаводов, день 1го воензавода) и количество симуляций (в этом вызове)
+        # checkpoint_path - файл прогресса перебора: словарь и развилка последней симуляции (см SweepCheckpoint)
+        
+        checkpoint = self.get_sweep_checkpoint(checkpoint_path, 'find_mil_extremum_linear', infr_av, laws_timeline.laws_timeline, civ_trade_av, date_end, mil_built_stop)
+        mil_built_dict = checkpoint.get('mil_built_dict', {}) # civ_num_to_build = 1, 2, ... len(mil_built_dict) - уже просимулированы
+        sim_num_resumed = len(mil_built_dict) # симуляции прерванного перебора в количество симуляций не входят
+        
+        if workers is not None: # параллельно - блоками по workers симуляций (развилки не используются)
+            
+            sim_num = 0
+            with get_executor(workers, self.pool_threads) as executor:
+                for civ_num_first in itertools.count(len(mil_built_dict) + 1, workers):
+                    
+                    civ_num_block = range(civ_num_first, civ_num_first + workers)
+                    sim_args_list = [(civ_num_to_build, infr_av, laws_timeline, civ_trade_av, date_end) for civ_num_to_build in civ_num_block]
+                    sim_num += workers
+                    
+                    for civ_num_to_build, (build_log, __) in zip(civ_num_block, self.map_build_sim(sim_args_list, executor)):
+                        
+                        mil_built_total, mil_built_day_1st = self.get_mil_built(build_log)
+                        if mil_built_total < mil_built_stop: 
+                            checkpoint.remove()
+                            return mil_built_dict, sim_num
+                        
+                        mil_built_dict[civ_num_to_build] = (mil_built_total, mil_built_day_1st)
+                    
+                    checkpoint.put(mil_built_dict=mil_built_dict, fork_state=None)
+        
+        # каждая следующая симуляция продолжается с развилки предыдущей (см build_sim_from_fork())
+        fork_search = self.fork_search
+        self.fork_search = True
+        
+        fork_state = checkpoint.get('fork_state')
+        if mil_built_dict: # продолжение перебора: развилка последней симуляции - из файла прогресса (None - начнем с 1го дня)
+            self.fork_state = fork_state and self.decode_state(fork_state)
+        
+        try: # прерванный перебор (в тч KeyboardInterrupt) не должен оставлять экземпляр в режиме поиска развилки
+            for civ_num_to_build in itertools.count(len(mil_built_dict) + 1): 
+                
+                if self.fork_state is None or civ_num_to_build == 1: 
+                    build_log = self.build_sim(civ_num_to_build, infr_av, laws_timeline, civ_trade_av, date_end)
+                else:
+                    build_log = self.build_sim_from_fork(civ_num_to_build, infr_av, date_end)
+                
+                mil_built_total, mil_built_day_1st = self.get_mil_built(build_log)
+    
+                if mil_built_total < mil_built_stop: # не делаем лишнюю работу, когда результат и так уже понятен
+                    break
+                
+                mil_built_dict[civ_num_to_build] = (mil_built_total, mil_built_day_1st)
+                
+                if checkpoint_path is not None:
+                    checkpoint.put(mil_built_dict=mil_built_dict, fork_state=self.fork_state and self.encode_state(self.fork_state))
+        finally:
+            self.fork_search = fork_search
+            self.day_start_state, self.fork_state = None, None
+        
+        checkpoint.remove()
+        
+        return mil_built_dict, civ_num_to_build - sim_num_resumed
+
+    def find_mil_extremum_golden(self, infr_av, laws_timeline, civ_trade_av, date_end, mil_built_stop, workers=None, scan_width=5, checkpoint_path=None):
+        # поиск золотым сечением для find_mil_extremum(): 
+            # - граница поиска: civ_num_to_build = 1, 2, 4, 8, ... пока воензаводов не меньше mil_built_stop
+            # - затем золотое сечение по отрезку до границы
+            # - если значения в 2х точках сечения равны (плато => унимодальность нарушена), 
+            # или отрезок стал не длиннее scan_width, то перебор всего оставшегося отрезка
+        # возвращает то же, что find_mil_extremum_linear()
+        # checkpoint_path - файл прогресса перебора: все симуляции (поиск детерминирован => при продолжении проходит их заново без симуляций)
+        
+        checkpoint = self.get_sweep_checkpoint(checkpoint_path, 'find_mil_extremum_golden', infr_av, laws_timeline.laws_timeline, civ_trade_av, date_end, mil_built_stop, scan_width)
+        mil_built_dict = checkpoint.get('mil_built_dict', {}) # все симуляции: civ_num_to_build:(количество воензаводов, день 1го воензавода)
+        sim_num_resumed = len(mil_built_dict)
+        
+        def get_mil_built_total(*civ_num_list): # воензаводов меньше mil_built_stop => точка вне области поиска
+            
+            civ_num_new = [civ_num_to_build for civ_num_to_build in dict.fromkeys(civ_num_list) if civ_num_to_build not in mil_built_dict]
+            sim_args_list = [(civ_num_to_build, infr_av, laws_timeline, civ_trade_av, date_end) for civ_num_to_build in civ_num_new]
+            for civ_num_to_build, (build_log, __) in zip(civ_num_new, self.map_build_sim(sim_args_list, executor)):
+                mil_built_dict[civ_num_to_build] = self.get_mil_built(build_log)
+                checkpoint.put(mil_built_dict=mil_built_dict)
+            
+            mil_built_total_list = [mil_built_dict[civ_num_to_build][0] for civ_num_to_build in civ_num_list]
+            return [{True:mil_built_total, False:-1}[mil_built_total >= mil_built_stop] for mil_built_total in mil_built_total_list]
+        
+        with get_executor(workers, self.pool_threads) as executor: # параллельно считаются пары точек сечения и перебор в конце
+            
+            civ_num_max = 1 
+            while get_mil_built_total(civ_num_max)[0] >= 0:
+                civ_num_max *= 2
+            
+            a, b = 1, civ_num_max - 1 # отрезок поиска (включительно)
+            inv_phi = (math.sqrt(5) - 1) / 2 
+            
+            while b - a > scan_width:
+                
+                c = b - round((b - a) * inv_phi)
+                d = a + round((b - a) * inv_phi)
+                mil_built_c, mil_built_d = get_mil_built_total(c, d)
+                
+                if mil_built_c < mil_built_d: 
+                    a = c + 1
+                elif mil_built_c > mil_built_d: 
+                    b = d - 1
+                else: 
+                    break
+            
+            get_mil_built_total(*range(a, b + 1))
+        
+        checkpoint.remove()
+        mil_built_dict_stop = {civ_num_to_build:value for civ_num_to_build, value in mil_built_dict.items() if value[0] >= mil_built_stop} 
+        return mil_built_dict_stop, len(mil_built_dict) - sim_num_resumed
+
+    # -----------------------------------------------------
+    # оптимум на много дат - по одному перебору:
+    # -----------------------------------------------------
+    
+    # замечание: 
+    # ход симуляции не зависит от date_end (это только день остановки) => лог симуляции до самой поздней даты 
+    # содержит логи симуляций до всех более ранних дат: воензаводы к дате - get_count() по BuildLog
+    
+    def find_mil_extremum_dates(self, infr_av, laws_timeline, civ_trade_av, date_end_list, mil_built_stop=10, workers=None, block_size=16, checkpoint_path=None):
+        # find_mil_extremum() для каждой даты из date_end_list: перебор civ_num_to_build = 1, 2, 3, ... - один, до самой поздней даты 
+        # (блоками по block_size симуляций - пакетом или в пуле, см visualize_efficiency())
+        # для каждой даты оптимум - как в find_mil_extremum_linear(): среди civ_num_to_build до 1го, при котором воензаводов меньше mil_built_stop
+        # возвращает таблицу: список (дата, оптимальное количество фабрик, максимум воензаводов, дата 1го воензавода)
+        # checkpoint_path - файл прогресса перебора: результаты всех завершенных блоков (см SweepCheckpoint)
+        
+        if not date_end_list:
+            raise ValueError('Упс! Список дат завершения симуляции пуст!')
+        
+        laws_timeline = self.get_law_schedule(laws_timeline) 
+        day_end_list = [self.get_day_end(date_end) for date_end in date_end_list] 
+        date_end_max = date_end_list[day_end_list.index(max(day_end_list))]
+        day_end_array = np.array(day_end_list)
+        
+        checkpoint = self.get_sweep_checkpoint(checkpoint_path, 'find_mil_extremum_dates', infr_av, laws_timeline.laws_timeline, civ_trade_av, tuple(date_end_list), mil_built_stop)
+        
+        # по civ_num_to_build = 1, 2, 3, ...: массивы по датам
+        mil_built_total_list = [np.array(mil_built_total) for mil_built_total in checkpoint.get('mil_built_total_list', [])]
+        mil_built_day_1st_list = [np.array(mil_built_day_1st) for mil_built_day_1st in checkpoint.get('mil_built_day_1st_list', [])]
+        sim_num_resumed = len(mil_built_total_list) # симуляции прерванного перебора в количество симуляций не входят
+        
+        with get_executor(workers, self.pool_threads) as executor:
+            for civ_num_first in itertools.count(len(mil_built_total_list) + 1, block_size):
+                
+                sim_args_list = [(civ_num_to_build, infr_av, laws_timeline, civ_trade_av, date_end_max) for civ_num_to_build in range(civ_num_first, civ_num_first + block_size)]
+                if workers is None and not self.printout: 
+                    sim_results = self.build_sim_batch(sim_args_list)
+                else:
+                    sim_results = self.map_build_sim(sim_args_list, executor)
+                
+                for build_log, __ in sim_results:
+                    build_log = BuildLog.from_log(build_log)
+                    mil_built_day_1st = build_log.get_first_day('mil') or 0
+                    
+                    mil_built_total_list.append(build_log.get_count('mil', day_end_array))
+                    mil_built_day_1st_list.append(np.where(mil_built_day_1st <= day_end_array, mil_built_day_1st, 0))
+                
+                if mil_built_total_list[-1][day_end_list.index(max(day_end_list))] < mil_built_stop: # к более ранним датам - тем более
+                    break
+                
+                if checkpoint_path is not None:
+                    checkpoint.put(mil_built_total_list=[mil_built_total.tolist() for mil_built_total in mil_built_total_list], 
+                                   mil_built_day_1st_list=[mil_built_day_1st.tolist() for mil_built_day_1st in mil_built_day_1st_list])
+        
+        checkpoint.remove()
+        
+        extremum_table = []
+        for date_idx, date_end in enumerate(date_end_list):
+            
+            mil_built_max, mil_built_1st_day, civ_num_to_build_optimum = 0, 0, 0
+            for civ_num_to_build, (mil_built_total, mil_built_day_1st) in enumerate(zip(mil_built_total_list, mil_built_day_1st_list), 1):
+                
+                if mil_built_total[date_idx] < mil_built_stop: # как в find_mil_extremum_linear()
+                    break
+                if mil_built_total[date_idx] >= mil_built_max: # при >= найдет последнее (см find_mil_extremum())
+                    mil_built_max, mil_built_1st_day, civ_num_to_build_optimum = int(mil_built_total[date_idx]), int(mil_built_day_1st[date_idx]), civ_num_to_build
+            
+            extremum_table.append((date_end, civ_num_to_build_optimum, mil_built_max, add_days(GAME_START, mil_built_1st_day)))
+        
+        print('Date end | Optimum civilian_f | Max military_f | Date of the 1st military_f built')
+        for date_end, civ_num_to_build_optimum, mil_built_max, mil_built_1st_date in extremum_table:
+            print('%s | %i | %i | %s' %(date_end, civ_num_to_build_optimum, mil_built_max, mil_built_1st_date))
+        print('Simulations run: %i (search: linear, dates: %i)\n' %(len(mil_built_total_list) - sim_num_resumed, len(date_end_list)))
+        
+        # fig = plt.gcf() # для версии на ПК
+        # fig.canvas.set_window_title(self.country) # для версии на ПК 
+        
+        plt.plot(day_end_list, [row[1] for row in extremum_table], '.-', label='Optimum civilian_f built')
+        plt.plot(day_end_list, [row[2] for row in extremum_table], '.-', label='Max military_f built')
+        plt.title('Finding the max num of the military_f built: %s - %s' %(min(date_end_list), max(date_end_list)))
+        plt.xlabel('Days (date_end)')
+        plt.ylabel('Number of factories')
+        plt.legend()
+        
+        plt.savefig('graph.png')
+        # plt.show() # для версии на ПК
+        
+        return extremum_table
+
 # =====================================================
 # класс BuildSimInfrEfficiency - симулятор строительства: 
 
@@ -1201,8 +3161,8 @@ class BuildSimMaxMilitary(BuildSimulator):
 
         # def build_sim(self, infr_initial, infr_up, laws_timeline='no_changes', civ_trade_av=0, date_end='default'): 
         # def visualize_equilibrium(self, laws_timeline, infr_up=1, civ_trade_av=0, add_dots_country=False):
-        # def is_cell_profitable(self, cell, laws_timeline, infr_up=1):
-        # def is_any_cell_profitable(self, laws_timeline, infr_up=1): # (beta)
+        # def is_cell_profitable(self, cell, laws_timeline, infr_up=1, civ_trade_av=0):
+        # def is_any_cell_profitable(self, laws_timeline, infr_up=1, civ_trade_av=0): # (beta)
   # --------------------------------------------
   
   # - параметры симуляции, которые задаются пользователем:
@@ -1260,8 +3220,22 @@ CELLS_DICT_DEMO = {
                   }  
 # =====================================================
 
+# окупаемость инфраструктуры (запись таблицы окупаемости - см get_payback_table()):
+# день равновесия и количество фабрик, построенных к нему в ячейке 0 
+Payback = namedtuple('Payback', ['day', 'civ_built'])
+
+# =====================================================
+
 class BuildSimInfrEfficiency(BuildSimulator):
     
+    state_fields = BuildSimulator.state_fields + ('civ_diff',) # + поле, добавленное в reset()
+    worker_settings = BuildSimulator.worker_settings + ('equilibrium_analytic',)
+    
+    # переключатель режима равновесия: 
+    # True - симуляция идет от события к событию, а день равновесия вычисляется сразу (см get_days_to_skip_limit())
+    # False - движок задается event_driven (по дням - civ_diff считается каждый день)
+    equilibrium_analytic = True
+    
     # -----------------------------------------------------
     def __init__(self, country_start=COUNTRY_DEFAULT): # упрощенная симуляция => self.obj_start не нужен
 
@@ -1272,6 +3246,12 @@ class BuildSimInfrEfficiency(BuildSimulator):
             self.country = country_start # страна симуляции
         else:
             raise ValueError("Некорректное значение для стартовых условий!")
+        
+        self.payback_tables = {} # таблицы окупаемости (см get_payback_table()) - в reset() не сбрасываются
+        self.law_checkpoints_last = None # см BuildSimulator.__init__()
+
+    def get_country_start(self):
+        return self.country
 
     def reset(self):
         super().reset()
@@ -1321,6 +3301,23 @@ class BuildSimInfrEfficiency(BuildSimulator):
     # новый quit_trigger:
     # -----------------------------------------------------
 
+    def get_days_to_skip_limit(self):
+        # между событиями civ_diff_actual не меняется => день равновесия вычисляется сразу:
+        # первый день k, когда civ_days_diff_total + k * civ_diff_actual < 0 (значения - целые)
+        
+        civ_days_diff_total = self.civ_diff['civ_days_diff_total']
+        civ_diff_actual = self.civ_diff['civ_diff_actual']
+        
+        if civ_diff_actual >= 0: # разница не уменьшается => до следующего события равновесие не наступит
+            return None
+        return civ_days_diff_total // -civ_diff_actual + 1
+
+    def skipped_days_optional_stuff(self, days):
+        self.civ_diff['civ_days_diff_total'] += self.civ_diff['civ_diff_actual'] * days
+
+    def is_event_driven(self):
+        return self.event_driven or self.equilibrium_analytic
+
     def quit_trigger(self):
       
         quit_trigger = self.civ_diff['civ_days_diff_total'] < 0 # достигнута точка равновесия, согласно описанию   
@@ -1332,7 +3329,7 @@ class BuildSimInfrEfficiency(BuildSimulator):
     # -----------------------------------------------------
    
     def progress_shift_lines(self, line_data): 
-        self.progress[0] = [self.build_order.pop(0), 0] 
+        self.progress[0] = ProgressLine(*self.build_order.popleft()) 
         # убрали шифт - исключительно для наглядности: 
         # строительство 0й ячейки продолжается по 0й линии, хотя по большому счету без разницы
     
@@ -1367,12 +3364,12 @@ class BuildSimInfrEfficiency(BuildSimulator):
         # header_str += '\n' + self.get_build_order_str().rstrip()
         header_str += '\n' + self.str_2
 
-        print(header_str)
+        self.print_sim(header_str)
             
     def print_output(self, optional_str, day, build_bonus, cons_goods_penalty, civ_for_lines, law_flag):
         super().print_output(optional_str, day, build_bonus, cons_goods_penalty, civ_for_lines, law_flag)
-        print('Построенные фабрики доступны:', self.get_civ_built_available(cons_goods_penalty))
-        print('Разница фабрико-дней:', self.civ_diff) 
+        self.print_sim('Построенные фабрики доступны:', self.get_civ_built_available(cons_goods_penalty))
+        self.print_sim('Разница фабрико-дней:', self.civ_diff) 
     
     # -----------------------------------------------------
     # новый build_sim:
@@ -1380,7 +3377,7 @@ class BuildSimInfrEfficiency(BuildSimulator):
     
     def build_sim(self, infr_initial, infr_up, laws_timeline='no_changes', civ_trade_av=0, date_end=INFINITE_LOOP_BREAKER): 
         
-        Cell.INFRASTR_DEFAULT = infr_initial
+        self.infr_default = infr_initial
         
         cell_name_0 = 'cell_0'
         cell_name_1 = 'cell_1'
@@ -1393,95 +3390,283 @@ class BuildSimInfrEfficiency(BuildSimulator):
         # предполагается, что date_end ~неограничен - мы хотим достичь точки равновесия 
         # => должен принимать значение по умолчанию = INFINITE_LOOP_BREAKER
 
+    # -----------------------------------------------------
+    # пакетная симуляция (numpy):
+    # -----------------------------------------------------
+    
+    # замечание: 
+    # в данной симуляции всегда 2 линии по 15 фабрик: 
+    # - линия 0 - ячейка 0: сначала infr_up уровней инфраструктуры, затем фабрики без конца
+    # - линия 1 - ячейка 1: фабрики без конца
+    # => состояние сценария - набор векторов (по одному значению на сценарий)
+    
+    def build_sim_batch(self, sim_args_list, country_start_list=None):
+        # пакетная версия build_sim() - все сценарии симулируются одновременно (см get_batch_scenarios())
+        # sim_args - аргументы build_sim(): (infr_initial, infr_up, laws_timeline, civ_trade_av, date_end)
+        # возвращает список (build_log, obj_built) в порядке sim_args_list - как map_build_sim()
+        
+        scenarios = self.get_batch_scenarios(sim_args_list, ('no_changes', 0, INFINITE_LOOP_BREAKER), country_start_list)
+        sim_num = len(scenarios)
+        
+        for sim_args, __, __ in scenarios: # проверки - как в Cell() и check_build_order()
+            infr_initial, infr_up = sim_args[:2]
+            if not isinstance(infr_initial, int) or infr_initial not in range(11):
+                raise ValueError("%s - некорректное значение для инфраструктуры ячейки!" %infr_initial)
+            if not isinstance(infr_up, int) or infr_up <= 0 or infr_initial + infr_up > 10:
+                raise ValueError('Упс! Очередь строительства некорректна!\nЯчейка: cell_0. Инфраструктура: %s. Количество уровней для постройки = %s - некорректное значение!' %(infr_initial, infr_up))
+        
+        # --------------------------------------------
+        # параметры и состояние сценариев:
+        # --------------------------------------------
+        
+        infr_in_order = np.array([sim_args[1] for sim_args, __, __ in scenarios], dtype=np.int64) # уровни инфраструктуры в очереди линии 0
+        infr_cell_0 = np.array([sim_args[0] for sim_args, __, __ in scenarios], dtype=np.int64) # инфраструктура ячейки 0
+        infr_bonus_1 = (10 + infr_cell_0) / 10 # инфраструктура ячейки 1 не меняется (как в get_progress_per_day())
+        day_end = np.array([self.get_day_end(sim_args[4]) for sim_args, __, __ in scenarios], dtype=np.int64)
+        
+        law_events = self.get_batch_law_events([law_schedule for __, __, law_schedule in scenarios])
+        
+        progress_dtype = {True: np.int64, False: float}[self.fixed_point]
+        build_points_0 = np.zeros(sim_num, dtype=progress_dtype) # прогресс линии 0
+        build_points_1 = np.zeros(sim_num, dtype=progress_dtype) # прогресс линии 1
+        cost_infr, cost_civ = self.get_object_cost('infr'), self.get_object_cost('civ')
+        
+        infr_built_0 = np.zeros(sim_num, dtype=np.int64)
+        civ_built_0 = np.zeros(sim_num, dtype=np.int64)
+        civ_built_1 = np.zeros(sim_num, dtype=np.int64)
+        
+        cons_goods_penalty = np.zeros(sim_num)
+        build_bonus_infr = np.zeros(sim_num)
+        build_bonus_civ = np.zeros(sim_num)
+        civ_diff_actual = np.zeros(sim_num, dtype=np.int64)
+        civ_days_diff_total = np.zeros(sim_num, dtype=np.int64)
+        
+        is_running = np.ones(sim_num, dtype=bool)
+        build_log_list = [[] for __ in range(sim_num)]
+        obj_built_list = [None] * sim_num
+        
+        def change_civ_diff(rows):
+            # change_civ_diff() для сценариев rows
+            civ_available_0 = civ_built_0[rows] - np.ceil(civ_built_0[rows] * cons_goods_penalty[rows]).astype(np.int64)
+            civ_available_1 = civ_built_1[rows] - np.ceil(civ_built_1[rows] * cons_goods_penalty[rows]).astype(np.int64)
+            civ_diff_actual[rows] = civ_available_1 - civ_available_0
+        
+        # --------------------------------------------
+        # основной цикл - общий для всех сценариев:
+        # --------------------------------------------
+        
+        for day in range(1, int(np.max(day_end, initial=0)) + 1):
+            
+            # изменение законов:
+            for rows, law_segment in law_events.get(day, []):
+                
+                if law_segment.cons_goods_changed:
+                    cons_goods_penalty[rows] = law_segment.cons_goods_penalty
+                    change_civ_diff(rows)
+                
+                build_bonus = dict(law_segment.build_bonus)
+                build_bonus_infr[rows] = build_bonus['infr']
+                build_bonus_civ[rows] = build_bonus['civ']
+            
+            # постройка объектов:
+            is_infr_0 = infr_in_order > 0
+            completed_0 = build_points_0 >= np.where(is_infr_0, cost_infr, cost_civ)
+            completed_1 = build_points_1 >= cost_civ
+            
+            for row in np.nonzero((completed_0 | completed_1) & is_running)[0]:
+                if completed_0[row]:
+                    build_log_list[row].append((day, {True:'infr', False:'civ'}[is_infr_0[row]]))
+                if completed_1[row]:
+                    build_log_list[row].append((day, 'civ'))
+            
+            infr_completed_0 = completed_0 & is_infr_0
+            civ_completed_0 = completed_0 & ~is_infr_0
+            
+            infr_built_0 += infr_completed_0
+            civ_built_0 += civ_completed_0
+            civ_built_1 += completed_1
+            
+            infr_in_order -= infr_completed_0
+            infr_cell_0 = np.where(infr_completed_0, np.minimum(infr_cell_0 + 1, 10), infr_cell_0) # как в infrastructure_up()
+            
+            # линия 0: последний уровень инфраструктуры => новая линия (фабрики), иначе - остаток прогресса сохраняется
+            line_replaced_0 = infr_completed_0 & (infr_in_order == 0)
+            build_points_0 = np.where(line_replaced_0, 0, np.where(completed_0, build_points_0 - np.where(is_infr_0, cost_infr, cost_civ), build_points_0))
+            build_points_1 = np.where(completed_1, build_points_1 - cost_civ, build_points_1)
+            
+            rows = np.nonzero(civ_completed_0 | completed_1)[0]
+            if rows.size:
+                change_civ_diff(rows)
+            
+            # опциональная часть и завершение сценариев:
+            civ_days_diff_total += civ_diff_actual
+            
+            for row in np.nonzero(is_running & ((civ_days_diff_total < 0) | (day_end == day)))[0]:
+                is_running[row] = False
+                build_log_list[row].append((day, 'end'))
+                obj_built_list[row] = {'infr':[int(infr_built_0[row]), 0], 'civ':[int(civ_built_0[row]), int(civ_built_1[row])]}
+            
+            if not is_running.any():
+                break
+            
+            # изменение прогресса линий (как в get_progress_per_day()):
+            is_infr_0 = infr_in_order > 0
+            build_points_0 += self.to_progress_units(np.where(is_infr_0, 5 * build_bonus_infr * 1 * 15, 5 * build_bonus_civ * ((10 + infr_cell_0) / 10) * 15))
+            build_points_1 += self.to_progress_units(5 * build_bonus_civ * infr_bonus_1 * 15)
+        
+        self.print_sim('ПАКЕТНАЯ СИМУЛЯЦИЯ: %i сценариев (промышленная эффективность инфраструктуры)' %sim_num)
+        return list(zip(build_log_list, obj_built_list))
+
     # -----------------------------------------------------
 
-    def visualize_equilibrium(self, laws_timeline, infr_up=1, civ_trade_av=0, add_dots_country=False):
+    def visualize_equilibrium(self, laws_timeline, infr_up=1, civ_trade_av=0, add_dots_country=False, workers=None, checkpoint_path=None):
         # 2 графика окупаемости строительства инфраструктуры согласно описанию в шапке файла
         # infr_up - количество уровней инфраструктуры, которые будут построены в ячейке 0
         # 0 <= infr_up <= 10
+        # workers - количество процессов для параллельных симуляций (None - последовательно, см map_build_sim())
+        # checkpoint_path - файл прогресса: записи таблицы окупаемости по мере симуляций (см SweepCheckpoint)
         
-        disable_printout()
+        quiet = self.quiet
+        self.quiet = True
         
-        # --------------------------------------------
-        # элементы оформления графика:
-        # --------------------------------------------
-        x_label = 'Initial infrastructure level'
-        y_label_list = ['Days to payback', 'Factories to payback']
-        title_list = ['infr_up=%i' %(infr_up), '']
-        color_list = ['b', 'r']
-        # --------------------------------------------
+        try:
+            # --------------------------------------------
+            # элементы оформления графика:
+            # --------------------------------------------
+            x_label = 'Initial infrastructure level'
+            y_label_list = ['Days to payback', 'Factories to payback']
+            title_list = ['infr_up=%i' %(infr_up), '']
+            color_list = ['b', 'r']
+            # --------------------------------------------
 
-        fig, ax = plt.subplots(nrows=1, ncols=2)
-        fig.set_size_inches(10, 5) # замечание: опционально под параметры монитора
-        # fig.canvas.set_window_title('HOI4 Infrastructure Efficiency') # для версии на ПК
+            fig, ax = plt.subplots(nrows=1, ncols=2)
+            fig.set_size_inches(10, 5) # замечание: опционально под параметры монитора
+            # fig.canvas.set_window_title('HOI4 Infrastructure Efficiency') # для версии на ПК
+        
+            infr_init_levels = list(range(0, 11 - infr_up)) # замечание: берем такой range, тк infr_initial + infr_up <= 10
+            x_coord = infr_init_levels
+            y_coord = [[],[]]
         
-        infr_init_levels = list(range(0, 11 - infr_up)) # замечание: берем такой range, тк infr_initial + infr_up <= 10
-        x_coord = infr_init_levels
-        y_coord = [[],[]]
+            laws_timeline = self.get_law_schedule(laws_timeline) # одно расписание законов на все симуляции
+            payback_table = self.get_payback_table(laws_timeline, civ_trade_av)
         
-        for infr_level in infr_init_levels:
-            day_end_sim = self.build_sim(infr_level, infr_up, laws_timeline, civ_trade_av)[-1][0]
-            civ_built_num_cell_0 = self.obj_built['civ'][0]
+            checkpoint = self.get_sweep_checkpoint(checkpoint_path, 'visualize_equilibrium', laws_timeline.laws_timeline, infr_up, civ_trade_av)
+            for infr_level, infr_up_level, day_end_sim, civ_built_num_cell_0 in checkpoint.get('payback', []):
+                payback_table.setdefault((infr_level, infr_up_level), Payback(day_end_sim, civ_built_num_cell_0))
+        
+            sim_args_list = [(infr_level, infr_up, laws_timeline, civ_trade_av) for infr_level in infr_init_levels if (infr_level, infr_up) not in payback_table]
+        
+            # замечание: 
+            # пакетная симуляция (build_sim_batch) здесь не используется: сценариев - не больше 11, а пакет идет день за днем 
+            # с постоянной ценой дня (~0.1 с на пакет) => он быстрее build_sim() по дням лишь от ~20 сценариев, 
+            # а равновесия сразу (equilibrium_analytic, ~1 мс на сценарий) - лишь от ~130
+            
+            with get_executor(workers, self.pool_threads) as executor:
+            
+                sim_results = self.map_build_sim(sim_args_list, executor)
+                for sim_args, (build_log, obj_built) in zip(sim_args_list, sim_results):
+                    payback_table[sim_args[:2]] = self.get_payback_from_result(build_log, obj_built)
+                    checkpoint.put(payback=[key + (int(payback.day), int(payback.civ_built)) for key, payback in payback_table.items()])
+        
+            checkpoint.remove()
+        
+            for infr_level in infr_init_levels:
+                day_end_sim, civ_built_num_cell_0 = payback_table[(infr_level, infr_up)]
             
-            y_coord[0].append(day_end_sim)
-            y_coord[1].append(civ_built_num_cell_0)
+                y_coord[0].append(day_end_sim)
+                y_coord[1].append(civ_built_num_cell_0)
 
 
-        for idx, row in enumerate(ax):
+            for idx, row in enumerate(ax):
         
-            row.plot(x_coord, y_coord[idx], color_list[idx])
-            row.set_xlabel(x_label)
-            row.set_ylabel(y_label_list[idx])
-            row.set_title(title_list[idx])
+                row.plot(x_coord, y_coord[idx], color_list[idx])
+                row.set_xlabel(x_label)
+                row.set_ylabel(y_label_list[idx])
+                row.set_title(title_list[idx])
 
-            if idx == 1: # координаты 2го графика (по слотам для стройки)
-                # payback_line = tuple(zip(coord_x, coord_y[idx])) # граница окупаемости по слотам строительства
+                if idx == 1: # координаты 2го графика (по слотам для стройки)
+                    # payback_line = tuple(zip(coord_x, coord_y[idx])) # граница окупаемости по слотам строительства
                 
-                if add_dots_country: # (beta)
+                    if add_dots_country: # (beta)
                     
-                    # варианты:
-                        # cells_country_list = [cell for cell in self.cells_dict.values() if cell.get_country() == self.country and self.country != COUNTRY_DEFAULT]
-                        # cells_country_list = [Cell(cell, *value) for cell, value in CELLS_DICT_DEMO.items() if value[-1] == self.country]
+                        # варианты:
+                            # cells_country_list = [cell for cell in self.cells_dict.values() if cell.get_country() == self.country and self.country != COUNTRY_DEFAULT]
+                            # cells_country_list = [Cell(cell, *value) for cell, value in CELLS_DICT_DEMO.items() if value[-1] == self.country]
                         
-                        # if len(cells_country_list):
-                            # dots_country = [(cell.get_infrastructure(), cell.get_obj_available()) for cell in cells_country_list]
+                            # if len(cells_country_list):
+                                # dots_country = [(cell.get_infrastructure(), cell.get_obj_available()) for cell in cells_country_list]
                         
-                    dots_country = [(value[0], value[1]) for value in CELLS_DICT_DEMO.values() if value[2] == self.country]
-                    dots_country_x, dots_country_y = zip(*dots_country)
-                    row.plot(dots_country_x, dots_country_y, 'og', label='Регионы: {0}\n(демонстрационный пример)'.format(self.country))
-                    plt.legend()
-
-        # plt.show() # для версии на ПК
-        plt.savefig('graph.png')
-        
-        enable_printout()
+                        dots_country = [(value[0], value[1]) for value in CELLS_DICT_DEMO.values() if value[2] == self.country]
+                        dots_country_x, dots_country_y = zip(*dots_country)
+                        row.plot(dots_country_x, dots_country_y, 'og', label='Регионы: {0}\n(демонстрационный пример)'.format(self.country))
+                        plt.legend()
+
+            # plt.show() # для версии на ПК
+            plt.savefig('graph.png')
+        finally: # исключение в симуляции или на графике не должно оставлять экземпляр в тихом режиме
+            self.quiet = quiet
         # print('Payback Line (infr_to_up=%i):\n%s\n' %(infr_up, payback_line))
         
         # return payback_line
     # -----------------------------------------------------
+    # таблица окупаемости:
+    # -----------------------------------------------------
+    
+    # замечание: 
+    # результат симуляции зависит только от (infr_initial, infr_up), расписания законов, civ_trade_av и режима (printout, fixed_point), но не от имени ячейки
+    # => для проверки окупаемости любого количества ячеек нужно не более 11 симуляций на каждое infr_up
+    
+    def get_payback_table(self, laws_timeline, civ_trade_av=0):
+        # таблица окупаемости для расписания законов и civ_trade_av: словарь (infr_initial, infr_up) -> Payback
+        # таблица заполняется по мере запросов (см get_payback()) и используется повторно во всех проверках этого экземпляра
+        
+        law_schedule = self.get_law_schedule(laws_timeline)
+        # расписание - по значению => подходит и заново скомпилированное расписание
+        # printout и fixed_point меняют результат (см get_scenario()) => у каждого режима своя таблица
+        table_key = (law_schedule.laws_timeline, civ_trade_av, self.printout, self.fixed_point)
+        return self.payback_tables.setdefault(table_key, {})
+    
+    def get_payback(self, infr_initial, infr_up, laws_timeline, civ_trade_av=0):
+        # окупаемость из таблицы (см get_payback_table()) - симуляция только при первом запросе
+        
+        law_schedule = self.get_law_schedule(laws_timeline)
+        payback_table = self.get_payback_table(law_schedule, civ_trade_av)
+        
+        if (infr_initial, infr_up) not in payback_table:
+            build_log = self.build_sim(infr_initial, infr_up, law_schedule, civ_trade_av)
+            payback_table[(infr_initial, infr_up)] = self.get_payback_from_result(build_log, self.obj_built)
+        
+        return payback_table[(infr_initial, infr_up)]
+    
+    def get_payback_from_result(self, build_log, obj_built):
+        # запись таблицы окупаемости по результату симуляции (build_log - обычный лог или BuildLog)
+        return Payback(BuildLog.from_log(build_log).day_end, obj_built['civ'][0])
+    
+    # -----------------------------------------------------
 
-    def is_cell_profitable(self, cell, laws_timeline, infr_up=1):
+    def is_cell_profitable(self, cell, laws_timeline, infr_up=1, civ_trade_av=0):
       
-        disable_printout()
+        quiet = self.quiet
+        self.quiet = True
         
-        self.reset()
+        try:
+            self.reset()
         
-        if isinstance(cell, str) and cell in self.cells_dict: # здесь cell - строка, имя существующей ячейки
-           cell = self.cells_dict[cell] 
+            if isinstance(cell, str) and cell in self.cells_dict: # здесь cell - строка, имя существующей ячейки
+               cell = self.cells_dict[cell] 
         
-        if not isinstance(cell, Cell):
-            raise ValueError('{0} - некорректное значение для ячейки!'.format(cell))
+            if not isinstance(cell, Cell):
+                raise ValueError('{0} - некорректное значение для ячейки!'.format(cell))
             
-        cell_infrastructure = cell.get_infrastructure()
-        cell_obj_available = cell.get_obj_available()
+            cell_infrastructure = cell.get_infrastructure()
+            cell_obj_available = cell.get_obj_available()
         
-        self.build_sim(cell_infrastructure, infr_up, laws_timeline)
-        civ_built_num_cell_0 = self.obj_built['civ'][0]
+            civ_built_num_cell_0 = self.get_payback(cell_infrastructure, infr_up, laws_timeline, civ_trade_av).civ_built
 
-        condition =  cell_obj_available >= civ_built_num_cell_0
-        verdict = {True:'YEAHHHH!', False:'NOOOOO!'}[condition]
-        
-        enable_printout()
+            condition =  cell_obj_available >= civ_built_num_cell_0
+            verdict = {True:'YEAHHHH!', False:'NOOOOO!'}[condition]
+        finally: # исключение (в тч некорректная ячейка) не должно оставлять экземпляр в тихом режиме
+            self.quiet = quiet
         
         print(self.str_1)
         print(cell)
@@ -1491,7 +3676,7 @@ class BuildSimInfrEfficiency(BuildSimulator):
         
         return condition
         
-    def is_any_cell_profitable(self, laws_timeline, infr_up=1): # (beta)
+    def is_any_cell_profitable(self, laws_timeline, infr_up=1, civ_trade_av=0): # (beta)
 
         self.reset()
         
@@ -1500,18 +3685,387 @@ class BuildSimInfrEfficiency(BuildSimulator):
             print('Нет ячеек для данной страны!')
             return
         
+        laws_timeline = self.get_law_schedule(laws_timeline) # одно расписание законов на все ячейки => одна таблица окупаемости
+        
         cells_profitable = []
         for cell in cells_country_list:
             print(cell)
             cell_name = cell.get_name()
-            if self.is_cell_profitable(cell_name, laws_timeline, infr_up):
+            if self.is_cell_profitable(cell_name, laws_timeline, infr_up, civ_trade_av):
                 cells_profitable.append(cell_name)
         
         return cells_profitable
         
 # =====================================================
-def testing():
-    pass
+# ПАРАЛЛЕЛЬНЫЕ СИМУЛЯЦИИ:
+# =====================================================
+
+def get_executor(workers, threads=False):
+    # пул из workers процессов (threads=True - потоков) для map_build_sim() (workers=None => без пула)
+    
+    # замечание: 
+    # при запуске процессов через spawn (Windows, macOS) вызов симуляций в скрипте должен быть под if __name__ == '__main__'
+    
+    if workers is None:
+        return contextlib.nullcontext()
+    if threads:
+        return ThreadPoolExecutor(max_workers=workers)
+    return ProcessPoolExecutor(max_workers=workers)
+
+def build_sim_worker(task):
+    # симуляция в пуле процессов/потоков (см BuildSimulator.map_build_sim())
+    # печать симуляции собирается в строку (свой поток печати у симуляции) - ее печатает родительская симуляция, сохраняя порядок
+    
+    sim_class, country_start, settings, sim_args = task
+    
+    sim = sim_class(country_start)
+    for name, value in settings.items():
+        setattr(sim, name, value)
+    
+    sim.output_stream = io.StringIO()
+    build_log = sim.build_sim(*sim_args)
+    
+    return build_log, sim.obj_built, sim.output_stream.getvalue()
+
+# =====================================================
+# ПРОВЕРКА ДВИЖКОВ СИМУЛЯЦИИ:
+# =====================================================
+
+# замечание: 
+# движок по событиям (event_driven), пакетная симуляция (build_sim_batch), день равновесия сразу (equilibrium_analytic), 
+# продолжение с развилки (build_sim_from_fork) и с контрольных точек по законам (law_checkpoints) должны давать 
+# в точности тот же результат, что и симуляция по дням (в тч в режиме fixed_point) => testing() сверяет их на случайных сценариях; 
+# перемотка прогресса между событиями (add_progress_days(), get_days_to_complete_float()) сверяется со сложением 
+# по дням на случайных линиях: сложение по дням во float нельзя заменить одним умножением 
+# (build_points + days * progress_per_day расходится с ним в большинстве случаев); 
+# сама симуляция по дням (и все движки) сверяется с эталоном - результатами исходной версии симулятора
+
+# законы случайных расписаний (по порядку, как в примерах main.py) и стартовые законы для стран не из CONDITIONS_START
+TESTING_LAWS = [['Свободная_торговля'], ['Строительство_1'], ['Строительство_2'], ['Военная_экономика'], ['Строительство_3']]
+TESTING_LAWS_START = ['Ограниченный_призыв', 'Ограниченный_экспорт', 'Частичная_мобилизация']
+
+TESTING_DAY_MAX = get_days_diff(GAME_START, INFINITE_LOOP_BREAKER)
+
+def get_testing_laws_days(rng):
+    # случайное расписание законов: первые k законов из TESTING_LAWS в случайные дни - список (день, законы)
+    # (в 1й день - стартовые законы страны)
+    
+    laws_num = rng.randint(0, len(TESTING_LAWS))
+    days = sorted(rng.sample(range(2, TESTING_DAY_MAX), laws_num))
+    return list(zip(days, TESTING_LAWS))
+
+def get_testing_laws_days_edited(rng, laws_days):
+    # то же расписание с одной правкой (как при ручной правке laws_timeline): без последнего закона или со сдвигом дня одного закона
+    
+    laws_days = list(laws_days)
+    if not laws_days:
+        return laws_days
+    if rng.random() < 0.25:
+        return laws_days[:-1]
+    
+    idx = rng.randrange(len(laws_days))
+    day_min, day_max = 2, TESTING_DAY_MAX # день - между соседними законами
+    if idx > 0:
+        day_min = laws_days[idx - 1][0] + 1
+    if idx < len(laws_days) - 1:
+        day_max = laws_days[idx + 1][0] - 1
+    laws_days[idx] = (rng.randint(day_min, day_max), laws_days[idx][1])
+    return laws_days
+
+def get_testing_laws_timeline(country_start, laws_days):
+    # laws_timeline по списку (день, законы); стартовые законы - для стран не из CONDITIONS_START
+    
+    laws_timeline = [[add_days(GAME_START, day), laws] for day, laws in laws_days]
+    if not (isinstance(country_start, str) and country_start in CONDITIONS_START):
+        laws_timeline.insert(0, [add_days(GAME_START, 1), TESTING_LAWS_START])
+    return laws_timeline
+
+def get_testing_scenarios(rng, sim_class, scenario_num):
+    # случайные сценарии: список (стартовые условия, аргументы build_sim()) - парами: 
+    # 2й сценарий пары - тот же, но с правкой расписания законов (для проверки контрольных точек по законам)
+    
+    country_start_list = list(CONDITIONS_START)
+    if sim_class is BuildSimMaxMilitary:
+        country_start_list.append({'civ': rng.randint(5, 60), 'mil': rng.randint(0, 40)})
+    else:
+        country_start_list.append(COUNTRY_DEFAULT)
+    
+    scenarios = []
+    while len(scenarios) < scenario_num:
+        
+        country_start = rng.choice(country_start_list)
+        laws_days = get_testing_laws_days(rng)
+        civ_trade_av = rng.randint(-10, 30)
+        date_end = add_days(GAME_START, rng.randint(30, TESTING_DAY_MAX))
+        
+        if sim_class is BuildSimMaxMilitary:
+            sim_args_base = (rng.randint(0, 60), rng.randint(0, 10))
+        else:
+            infr_initial = rng.randint(0, 9)
+            sim_args_base = (infr_initial, rng.randint(1, 10 - infr_initial))
+        
+        for laws_days in (laws_days, get_testing_laws_days_edited(rng, laws_days)):
+            laws_timeline = get_testing_laws_timeline(country_start, laws_days)
+            scenarios.append((country_start, sim_args_base + (laws_timeline, civ_trade_av, date_end)))
+    
+    return scenarios
+
+def get_testing_sim(sim_class, country_start, **settings):
+    # экземпляр симуляции для проверки: тихий, без подробной печати, кэша и хранилища; settings - поля класса для этого экземпляра
+    
+    sim = sim_class(country_start)
+    sim.quiet, sim.printout, sim.log_columnar = True, False, False
+    sim.result_cache, sim.result_store = None, None
+    
+    for name, value in settings.items():
+        setattr(sim, name, value)
+    return sim
+
+def get_testing_settings(sim_class, fixed_point=False):
+    # поля класса симуляции по дням - эталона для сверки движков (fixed_point - режим арифметики, см BuildSimulator.fixed_point)
+    
+    settings_ref = {'fixed_point': fixed_point}
+    if sim_class is BuildSimInfrEfficiency: # по дням - без равновесия сразу (у него свой ход от события к событию)
+        settings_ref['equilibrium_analytic'] = False
+    return settings_ref
+
+def get_testing_engines(sim_class):
+    # движки для сверки с симуляцией по дням: список (название, поля класса)
+    
+    engines = [('event_driven', {'event_driven': True})]
+    if sim_class is BuildSimInfrEfficiency:
+        engines.append(('equilibrium_analytic', {'equilibrium_analytic': True}))
+    return engines
+
+def get_testing_results(sim_class, scenarios, settings_ref):
+    # результаты симуляции по дням (эталон для сверки) - с нового экземпляра на каждый сценарий
+    
+    results_ref = []
+    for country_start, sim_args in scenarios:
+        sim = get_testing_sim(sim_class, country_start, **settings_ref)
+        build_log = sim.build_sim(*sim_args)
+        results_ref.append(([list(row) for row in build_log], deepcopy(sim.obj_built)))
+    return results_ref
+
+def check_testing_result(engine, build_log, obj_built, result_ref, sim_class, country_start, sim_args):
+    # сверка результата симуляции с результатом симуляции по дням
+    
+    if ([list(row) for row in build_log], obj_built) != result_ref:
+        raise ValueError('Упс! %s: результат отличается от симуляции по дням!\nСимуляция: %s(%s).build_sim%s' %(engine, sim_class.__name__, country_start, sim_args))
+
+def check_testing_engines(sim_class, scenarios, results_ref, settings_ref):
+    # сверка движков из get_testing_engines() с симуляцией по дням - с нового экземпляра на каждый сценарий (возвращает число симуляций)
+    
+    engines = get_testing_engines(sim_class)
+    for engine, settings in engines:
+        for (country_start, sim_args), result_ref in zip(scenarios, results_ref):
+            sim = get_testing_sim(sim_class, country_start, **dict(settings_ref, **settings))
+            build_log = sim.build_sim(*sim_args)
+            check_testing_result(engine, build_log, sim.obj_built, result_ref, sim_class, country_start, sim_args)
+    
+    return len(scenarios) * len(engines)
+
+def check_testing_batch(sim_class, scenarios, results_ref, settings_ref):
+    # сверка пакетной симуляции (build_sim_batch) с симуляцией по дням - все сценарии одним пакетом (возвращает число симуляций)
+    
+    sim = get_testing_sim(sim_class, scenarios[0][0], **settings_ref)
+    sim_results = sim.build_sim_batch([sim_args for __, sim_args in scenarios], [country_start for country_start, __ in scenarios])
+    for (country_start, sim_args), (build_log, obj_built), result_ref in zip(scenarios, sim_results, results_ref):
+        check_testing_result('build_sim_batch', build_log, obj_built, result_ref, sim_class, country_start, sim_args)
+    
+    return len(scenarios)
+
+def check_testing_checkpoints(rng, sim_class, scenarios, results_ref, settings_ref):
+    # сверка продолжения с контрольных точек по законам (law_checkpoints) с симуляцией по дням - один экземпляр на стартовые условия: 
+    # сценарии пары идут подряд => 2й продолжается с контрольной точки 1го (возвращает число симуляций)
+    
+    sims = {}
+    for (country_start, sim_args), result_ref in zip(scenarios, results_ref):
+        start_key = repr(country_start)
+        if start_key not in sims:
+            sims[start_key] = get_testing_sim(sim_class, country_start, law_checkpoints=True, event_driven=rng.random() < 0.5, **settings_ref)
+        sim = sims[start_key]
+        build_log = sim.build_sim(*sim_args)
+        check_testing_result('law_checkpoints', build_log, sim.obj_built, result_ref, sim_class, country_start, sim_args)
+    
+    return len(scenarios)
+
+def check_testing_forks(rng, sim_class, scenarios, settings_ref):
+    # сверка продолжения с развилки (build_sim_from_fork) с симуляцией по дням: перебор civ_num_to_build = 1, 2, ... 
+    # как в find_mil_extremum_linear() - на первых сценариях (возвращает число симуляций)
+    
+    sim_count = 0
+    for country_start, sim_args in scenarios[:max(len(scenarios) // 10, 1)]:
+        
+        sim = get_testing_sim(sim_class, country_start, fork_search=True, event_driven=rng.random() < 0.5, **settings_ref)
+        sim_ref = get_testing_sim(sim_class, country_start, **settings_ref)
+        __, infr_av, laws_timeline, civ_trade_av, date_end = sim_args
+        
+        for civ_num_to_build in range(1, rng.randint(2, 30)):
+            sim_args = (civ_num_to_build, infr_av, laws_timeline, civ_trade_av, date_end)
+            build_log_ref = sim_ref.build_sim(*sim_args)
+            if sim.fork_state is None or civ_num_to_build == 1:
+                build_log = sim.build_sim(*sim_args)
+            else:
+                build_log = sim.build_sim_from_fork(civ_num_to_build, infr_av, date_end)
+            check_testing_result('build_sim_from_fork', build_log, sim.obj_built, ([list(row) for row in build_log_ref], sim_ref.obj_built), sim_class, country_start, sim_args)
+            sim_count += 1
+    
+    return sim_count
+
+def check_progress_days(rng, check_num):
+    # сверка перемотки прогресса линии (add_progress_days(), get_days_to_complete_float()) со сложением по дням на check_num случайных линиях
+    # (дней - до нескольких тысяч, т.е. в тч мимо прямого сложения до PROGRESS_DAYS_DIRECT; половина линий - с ничьими округления)
+    
+    for check_idx in range(check_num):
+        
+        if check_idx % 2:
+            build_points = float(rng.randint(1, 1 << 20)) * 2.0 ** rng.randint(-30, 0)
+            progress_per_day = math.ulp(build_points) * (rng.randint(1, 1000) + 0.5) # ничья: остаток - ровно половина шага сетки
+        else:
+            build_points = rng.choice([0.0, rng.uniform(0, 200), 0.7])
+            progress_per_day = rng.choice([5 * rng.choice([1.0, 1.1, 1.15, 1.3, 1.45]) * rng.choice([1.0, 1.1, 1.5, 1.9]) * rng.randint(1, 15), 
+                                           rng.uniform(0.01, 200), 2.0 ** -rng.randint(1, 20) * 3])
+        days = rng.randint(1, 5000)
+        
+        object_cost = rng.choice(list(OBJ_COST.values()))
+        
+        build_points_ref, days_ref = build_points, None
+        for day in range(1, days + 1):
+            build_points_ref += progress_per_day
+            if days_ref is None and build_points_ref >= object_cost:
+                days_ref = day
+        
+        if add_progress_days(build_points, progress_per_day, days) != build_points_ref:
+            raise ValueError('Упс! add_progress_days(%r, %r, %i): прогресс отличается от сложения по дням!' %(build_points, progress_per_day, days))
+        if get_days_to_complete_float(build_points, object_cost, progress_per_day, days) != days_ref:
+            raise ValueError('Упс! get_days_to_complete_float(%r, %r, %r, %i): день завершения отличается от сложения по дням!' %(build_points, object_cost, progress_per_day, days))
+
+# -----------------------------------------------------
+# эталон (golden): результаты build_sim() исходной версии симулятора (коммит baseline - до движков и оптимизаций) 
+# на фиксированных сценариях get_golden_scenarios(): build_log, obj_built и печать симуляции
+# -----------------------------------------------------
+
+# замечание: 
+# файл эталона получен прогоном get_golden_scenarios() на исходной версии simulator.py - каждый сценарий с нового экземпляра;
+# подробная печать BuildSimMaxMilitary в эталон не входит: имена generic-ячеек и печать очереди строительства изменились 
+# (общие generic-ячейки, ленивые источники очереди), результаты и краткая печать - те же
+
+TESTING_GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testing_golden.json')
+
+TESTING_GOLDEN_LAWS = [[(1936, 3, 11), ['Свободная_торговля']], [(1936, 6, 27), ['Строительство_1']], 
+                       [(1937, 4, 22), ['Строительство_2']], [(1937, 12, 1), ['Военная_экономика']], 
+                       [(1939, 4, 15), ['Строительство_3']]]
+
+def get_golden_scenarios():
+    # фиксированные сценарии эталона: список (класс симуляции, стартовые условия, аргументы build_sim(), подробная печать)
+    
+    laws_timeline = TESTING_GOLDEN_LAWS
+    laws_timeline_start = [[(1936, 1, 1), TESTING_LAWS_START]] + TESTING_GOLDEN_LAWS # для стран не из CONDITIONS_START
+    build_order = [['Москва', 'infr', 2], ['Харьков', 'civ', 3], ['Винтерфелл', 'mil', 4]]
+    build_order_2 = [['Москва', 'civ', 5], ['Сталинград', 'infr', 3], ['Харьков', 'mil', 5], ['Сталинград', 'civ', -1]]
+    
+    scenarios = [(BuildSimulator, 'СССР', (build_order, laws_timeline, 10), True), 
+                 (BuildSimulator, 'СССР', (build_order, laws_timeline, 10), False), 
+                 (BuildSimulator, 'СССР', (build_order_2, laws_timeline, 3, (1940, 6, 1)), False), 
+                 (BuildSimulator, 'СССР', (build_order,), False)]
+    
+    for country_start, civ_num_to_build, infr_av in itertools.product(['СССР', 'ГЕРМАНИЯ', 'США', 'ФРАНЦИЯ'], [0, 5, 17, 40], [3, 9]):
+        scenarios.append((BuildSimMaxMilitary, country_start, (civ_num_to_build, infr_av, laws_timeline, 10, (1941, 1, 1)), False))
+    scenarios += [(BuildSimMaxMilitary, 'СССР', (10, 5), False), 
+                  (BuildSimMaxMilitary, {'civ': 10, 'mil': 5}, (12, 5, laws_timeline_start, 0, (1940, 1, 1)), False)]
+    
+    for infr_initial, infr_up in itertools.product(range(10), [1, 3]):
+        if infr_initial + infr_up <= 10:
+            scenarios.append((BuildSimInfrEfficiency, 'ГЕРМАНИЯ', (infr_initial, infr_up, laws_timeline, 5), False))
+    scenarios += [(BuildSimInfrEfficiency, 'ГЕРМАНИЯ', (5, 2, laws_timeline, 5), True), 
+                  (BuildSimInfrEfficiency, 'СССР', (3, 2), False)]
+    
+    return scenarios
+
+def get_golden_result(sim_class, country_start, sim_args, printout, settings):
+    # результат сценария эталона в виде записи файла (см build_sim_worker()): build_log, obj_built и печать симуляции
+    
+    settings = dict(settings, printout=printout, quiet=False, log_columnar=False, result_cache=None, result_store=None)
+    build_log, obj_built, output = build_sim_worker((sim_class, country_start, settings, sim_args))
+    
+    result = {'build_log': [list(row) for row in build_log], 'obj_built': obj_built, 'output': output}
+    return json.loads(json.dumps(result)) # кортежи => списки, как в файле
+
+def check_golden_results():
+    # сверка симуляции по дням и движков из get_testing_engines() с эталоном (возвращает число симуляций)
+    
+    with open(TESTING_GOLDEN_PATH, encoding='utf-8') as file:
+        results_golden = json.load(file)
+    
+    scenarios = get_golden_scenarios()
+    if len(scenarios) != len(results_golden):
+        raise ValueError('Упс! Файл эталона не соответствует сценариям get_golden_scenarios()!')
+    
+    sim_count = 0
+    for (sim_class, country_start, sim_args, printout), result_golden in zip(scenarios, results_golden):
+        
+        scenario = json.loads(json.dumps({'sim': sim_class.__name__, 'country_start': country_start, 'sim_args': sim_args, 'printout': printout}))
+        if any(result_golden[name] != value for name, value in scenario.items()):
+            raise ValueError('Упс! Файл эталона не соответствует сценариям get_golden_scenarios()!\nСценарий: %s' %scenario)
+        
+        for engine, settings in [('по дням', {})] + get_testing_engines(sim_class):
+            settings = dict(get_testing_settings(sim_class), **settings)
+            result = get_golden_result(sim_class, country_start, sim_args, printout, settings)
+            for name in ('build_log', 'obj_built', 'output'):
+                if result[name] != result_golden[name]:
+                    raise ValueError('Упс! %s: %s отличается от эталона (исходной версии)!\nСимуляция: %s(%s).build_sim%s' %(engine, name, sim_class.__name__, country_start, sim_args))
+            sim_count += 1
+    
+    return sim_count
+
+def check_golden_batch():
+    # сверка пакетной симуляции с эталоном - сценарии каждого класса с build_sim_batch() одним пакетом, без печати (возвращает число симуляций)
+    
+    with open(TESTING_GOLDEN_PATH, encoding='utf-8') as file:
+        results_golden = json.load(file)
+    
+    sim_count = 0
+    for sim_class in (BuildSimMaxMilitary, BuildSimInfrEfficiency):
+        
+        scenarios = [(country_start, sim_args, result_golden) for (sim_class_golden, country_start, sim_args, __), result_golden 
+                     in zip(get_golden_scenarios(), results_golden) if sim_class_golden is sim_class]
+        
+        sim = get_testing_sim(sim_class, scenarios[0][0], **get_testing_settings(sim_class))
+        sim_results = sim.build_sim_batch([sim_args for __, sim_args, __ in scenarios], [country_start for country_start, __, __ in scenarios])
+        for (country_start, sim_args, result_golden), (build_log, obj_built) in zip(scenarios, sim_results):
+            if json.loads(json.dumps([[list(row) for row in build_log], obj_built])) != [result_golden['build_log'], result_golden['obj_built']]:
+                raise ValueError('Упс! build_sim_batch: результат отличается от эталона (исходной версии)!\nСимуляция: %s(%s).build_sim%s' %(sim_class.__name__, country_start, sim_args))
+        sim_count += len(scenarios)
+    
+    return sim_count
+
+def testing(scenario_num=50, seed=None):
+    # сверка симуляции по дням и движков с эталоном, затем движков с симуляцией по дням на scenario_num случайных сценариях каждого класса
+    # (в режимах float и fixed_point; эталон - только float, как в исходной версии)
+    # seed - для повторения проверки (печатается в итоге); расхождение => ValueError со сценарием
+    
+    if seed is None:
+        seed = random.randrange(10 ** 6)
+    rng = random.Random(seed)
+    
+    sim_count = check_golden_results() + check_golden_batch()
+    check_progress_days(rng, scenario_num * 20)
+    
+    for fixed_point, sim_class in itertools.product((False, True), (BuildSimMaxMilitary, BuildSimInfrEfficiency)):
+        
+        scenarios = get_testing_scenarios(rng, sim_class, scenario_num)
+        settings_ref = get_testing_settings(sim_class, fixed_point)
+        
+        results_ref = get_testing_results(sim_class, scenarios, settings_ref)
+        sim_count += len(scenarios) + check_testing_engines(sim_class, scenarios, results_ref, settings_ref)
+        sim_count += check_testing_batch(sim_class, scenarios, results_ref, settings_ref)
+        sim_count += check_testing_checkpoints(rng, sim_class, scenarios, results_ref, settings_ref)
+        if sim_class is BuildSimMaxMilitary:
+            sim_count += check_testing_forks(rng, sim_class, scenarios, settings_ref)
+    
+    print('Проверка движков (seed=%i): %i симуляций - результаты совпадают с эталоном и симуляцией по дням' %(seed, sim_count))
+    return sim_count
 
 if __name__ == '__main__':
     testing()